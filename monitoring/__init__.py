@@ -0,0 +1 @@
+"""Спільна логіка обробки даних для сторінок моніторингу цін."""
@@ -0,0 +1,263 @@
+"""HTTP API лише для читання: ряди, таблиці змін і підсумки міст.
+
+Відповіді будуються тими самими кешованими етапами, що й сторінки
+(monitoring.pipeline). Кеші, обмеження запитів до Google Sheets і прогрів
+належать процесу, тому без додаткових запитів до Google Sheets API працює
+лише в процесі сервера сторінок, змонтований під /api (monitoring.asgi):
+
+    python -m monitoring.serve --api
+
+Окремий процес API має власні кеші, ліміт запитів і прогрів і сам читає таблиці:
+
+    python -m monitoring.api --port 8000
+
+Готові відповіді кешуються за версією даних, а ETag містить версію, тож
+клієнт з актуальною копією отримує 304 без повторного розрахунку.
+
+    GET /cities
+    GET /{місто}/{prices|quantities}/series?start=2024-01-01&end=2024-06-30&product=...&format=arrow
+    GET /{місто}/{prices|quantities}/changes?start=...&end=...&product=...&fill=limit&fill_limit=30
+    GET /{місто}/{prices|quantities}/summary?start=...&end=...&product=...
+
+Формат відповіді - параметр format (json, arrow, csv, parquet) або заголовок
+Accept: application/vnd.apache.arrow.stream. Товари можна повторювати.
+"""
+import argparse
+import hashlib
+import io
+import logging
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from monitoring.cities import CITIES, KINDS
+from monitoring.export import EXPORT_FORMATS, write_export
+from monitoring.fill import DEFAULT_LIMIT_DAYS, DEFAULT_STRATEGY, FILL_STRATEGIES, MAX_DAYS
+from monitoring.memory import MemoryBudgetExceeded, check_budget, frame_estimate
+
+logger = logging.getLogger(__name__)
+
+# Скільки готових відповідей тримати в пам'яті
+MAX_RESPONSES = 256
+# Скільки секунд клієнт може не перевіряти відповідь повторно
+CACHE_SECONDS = 60
+
+FORMATS = {"json": ("application/json", "json"), **EXPORT_FORMATS}
+
+_responses_lock = threading.Lock()
+_responses = OrderedDict()
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def _error(status_code, message):
+    return JSONResponse({"error": message}, status_code=status_code)
+
+
+def _response_format(request):
+    fmt = request.query_params.get("format")
+    if fmt is None:
+        accept = request.headers.get("accept", "")
+        fmt = "arrow" if FORMATS["arrow"][0] in accept else "json"
+    if fmt not in FORMATS:
+        raise BadRequest(f"Невідомий формат: {fmt}")
+    return fmt
+
+
+def _date_param(request, name, default):
+    value = request.query_params.get(name)
+    if value is None:
+        return default
+    try:
+        return pd.to_datetime(value, format="%Y-%m-%d")
+    except ValueError:
+        raise BadRequest(f"Параметр {name} має бути датою у форматі YYYY-MM-DD")
+
+
+def _int_param(request, name, default, minimum=None):
+    value = request.query_params.get(name)
+    if value is None:
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise BadRequest(f"Параметр {name} має бути цілим числом")
+    if minimum is not None and value < minimum:
+        raise BadRequest(f"Параметр {name} має бути не менше {minimum}")
+    return value
+
+
+def _encode(frame, fmt):
+    if fmt == "json":
+        return frame.to_json(orient="records", date_format="iso", force_ascii=False).encode()
+    sink = io.BytesIO()
+    write_export([frame], fmt, sink)
+    return sink.getvalue()
+
+
+def _city_request(request):
+    """Дані міста для запиту: блок товар × дата, стовпець товару, версія, параметри."""
+    from monitoring.pipeline import city_table, date_bounds
+
+    city_id, kind = request.path_params["city"], request.path_params["kind"]
+    if city_id not in CITIES or kind not in KINDS:
+        raise LookupError(f"Немає таблиці {city_id}/{kind}")
+
+    block, product_column, version = city_table(city_id, kind)
+    min_date, max_date = date_bounds(version, KINDS[kind][0], block)
+    start = _date_param(request, "start", min_date)
+    end = _date_param(request, "end", max_date)
+    if end < start:
+        raise BadRequest("Кінцева дата не може бути раніше початкової")
+    products = request.query_params.getlist("product") or None
+    return block, product_column, version, start, end, products
+
+
+def _cached(request, version, fmt, build):
+    """Відповідь з кешу за версією даних або побудова через build() -> DataFrame."""
+    query = sorted(item for item in request.query_params.multi_items() if item[0] != "format")
+    key = f"{request.url.path}?{query}&{fmt}"
+    etag = f'"{version}-{hashlib.sha1(key.encode()).hexdigest()[:12]}"'
+    headers = {"ETag": etag, "Cache-Control": f"max-age={CACHE_SECONDS}"}
+
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    with _responses_lock:
+        body = _responses.get((key, version))
+        if body is not None:
+            _responses.move_to_end((key, version))
+    if body is None:
+        body = _encode(build(), fmt)
+        with _responses_lock:
+            _responses[(key, version)] = body
+            while len(_responses) > MAX_RESPONSES:
+                _responses.popitem(last=False)
+
+    return Response(body, media_type=FORMATS[fmt][0], headers=headers)
+
+
+def _handle(build_response):
+    """Перетворює помилки запиту і завантаження на JSON-відповіді з кодом стану."""
+    def endpoint(request):
+        try:
+            return build_response(request)
+        except BadRequest as e:
+            return _error(400, str(e))
+        except LookupError as e:
+            return _error(404, str(e).strip("'\""))
+        except Exception as e:
+            logger.exception("Помилка обробки %s", request.url.path)
+            return _error(503, f"Дані тимчасово недоступні: {e}")
+    return endpoint
+
+
+def cities(request):
+    return JSONResponse({
+        city_id: {"name": city["name"], "kinds": list(KINDS)}
+        for city_id, city in CITIES.items()
+    })
+
+
+def series(request):
+    """Очищені значення (довгий формат) за діапазоном дат і товарами."""
+    fmt = _response_format(request)
+    block, product_column, version, start, end, products = _city_request(request)
+
+    def build():
+        return block.to_long(products, start, end)
+
+    return _cached(request, version, fmt, build)
+
+
+def changes(request):
+    """Таблиця змін, як на сторінці міста, з обраною стратегією заповнення.
+
+    Заповнення останнім відомим значенням (fill=locf) рахується зі стиснених
+    рядів для будь-якого діапазону. Інші стратегії будують денну матрицю, тому
+    діапазон обмежено MAX_DAYS днями, а розмір матриці - бюджетом пам'яті.
+    """
+    from monitoring.pipeline import change_table, pivot_table
+
+    fmt = _response_format(request)
+    block, product_column, version, start, end, products = _city_request(request)
+    fill_strategy = request.query_params.get("fill", DEFAULT_STRATEGY)
+    if fill_strategy not in FILL_STRATEGIES:
+        raise BadRequest(f"Невідома стратегія заповнення: {fill_strategy}")
+    fill_limit = _int_param(request, "fill_limit", DEFAULT_LIMIT_DAYS, minimum=1)
+
+    value_name = KINDS[request.path_params["kind"]][0]
+    # Без переліку товарів - усі товари таблиці
+    selected = products if products is not None else block.products.tolist()
+    # Обидві межі включно: стільки рядків матиме денна матриця
+    days = (end - start).days + 1
+    if fill_strategy != "locf":
+        if days > MAX_DAYS:
+            raise BadRequest(
+                f"Діапазон {days} днів довший за {MAX_DAYS}. Оберіть коротший період "
+                "або fill=locf, яке рахується для будь-якого діапазону."
+            )
+        try:
+            check_budget(frame_estimate(days, len(selected)))
+        except MemoryBudgetExceeded as e:
+            raise BadRequest(str(e))
+
+    def build():
+        slice_key = (version, value_name, product_column, tuple(selected), start.date(), end.date())
+        # Стиснені ряди не потребують зрізу блоку
+        pivot = pivot_table(slice_key, block) if fill_strategy != "locf" else None
+        result_df, _ = change_table(slice_key, fill_strategy, fill_limit, pivot, block)
+        return result_df
+
+    return _cached(request, version, fmt, build)
+
+
+def summary(request):
+    """Підсумки за діапазоном (початкове, кінцеве, середнє, максимум) зі стиснених рядів."""
+    from monitoring.pipeline import run_table
+
+    fmt = _response_format(request)
+    block, product_column, version, start, end, products = _city_request(request)
+
+    def build():
+        runs = run_table(version, KINDS[request.path_params["kind"]][0], product_column, block)
+        stats = runs.range_stats(start, end, products)
+        return stats.rename_axis(product_column).reset_index()
+
+    return _cached(request, version, fmt, build)
+
+
+def create_app():
+    return Starlette(routes=[
+        Route("/cities", cities),
+        Route("/{city}/{kind}/series", _handle(series)),
+        Route("/{city}/{kind}/changes", _handle(changes)),
+        Route("/{city}/{kind}/summary", _handle(summary)),
+    ])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP API моніторингу цін")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger("monitoring").setLevel(logging.INFO)
+
+    import uvicorn
+
+    from monitoring.warmup import start_warmup
+
+    start_warmup()
+    uvicorn.run(create_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
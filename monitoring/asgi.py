@@ -0,0 +1,15 @@
+"""Сервер сторінок і HTTP API в одному процесі.
+
+API (monitoring.api) змонтовано в сервер Streamlit під /api, тож він
+користується тими самими кешами етапів, обмеженням запитів до Google Sheets і
+прогрівом, що й сторінки, і не читає таблиці вдруге. Запускається через
+
+    python -m monitoring.serve --api [аргументи streamlit run]
+"""
+import streamlit as st
+from starlette.routing import Mount
+
+from monitoring.api import create_app
+from monitoring.serve import MAIN_SCRIPT
+
+app = st.App(MAIN_SCRIPT, routes=[Mount("/api", app=create_app())])
@@ -0,0 +1,81 @@
+"""Індекс цін кошика з вагами з таблиці кількості.
+
+Усі формули рахуються однією матричною операцією над денними матрицями
+дата × товар, починаючи з базового дня (початок обраного періоду):
+
+- Ласпейрес: sum(p_t * q_0) / sum(p_0 * q_0)
+- Пааше: sum(p_t * q_t) / sum(p_0 * q_t)
+- Ланцюговий (Ласпейрес з щоденним переважуванням): добуток
+  sum(p_t * q_{t-1}) / sum(p_{t-1} * q_{t-1})
+
+У кожну суму входять лише товари, для яких відомі обидві ціни (порівнянні товари).
+Кошик Ласпейреса і Пааше визначається в базовий день, тому товари, що
+з'явилися пізніше, потрапляють у кошик, якщо період починається після їхньої появи.
+"""
+import numpy as np
+import pandas as pd
+
+INDEX_FORMULAS = {
+    "laspeyres": "Ласпейрес",
+    "paasche": "Пааше",
+    "chain": "Ланцюговий",
+}
+
+
+def _ratio(numerator, denominator):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator > 0, numerator / denominator, np.nan)
+
+
+def aligned_matrices(prices, quantities):
+    """Матриці цін і кількостей з однаковими датами і товарами.
+
+    prices і quantities - денні матриці дата × товар (WideBlock.daily). Ціни
+    переносяться вперед з останнього відомого дня, кількість без даних - 0.
+    """
+    prices = prices.ffill()
+
+    products = prices.columns.intersection(quantities.columns)
+    quantities = quantities.reindex(index=prices.index, columns=products).ffill().fillna(0)
+    return prices[products], quantities
+
+
+def basket_index(prices, quantities):
+    """Індекси для кожного дня матриць (база 100 - перший день)."""
+    p = prices.to_numpy(dtype=float)
+    q = quantities.to_numpy(dtype=float)
+    if p.size == 0:
+        return pd.DataFrame(columns=[*INDEX_FORMULAS.values(), "Товарів у кошику"], index=prices.index)
+
+    known = ~np.isnan(p)
+    p_filled = np.nan_to_num(p)
+    p0, q0, known0 = p_filled[0], q[0], known[0]
+
+    # Ласпейрес і Пааше: порівнянні товари - з ціною в базовий і поточний день
+    matched = known & known0
+    laspeyres = _ratio((p_filled * q0 * matched).sum(axis=1), (p0 * q0 * matched).sum(axis=1))
+    paasche = _ratio((p_filled * q * matched).sum(axis=1), (p0 * q * matched).sum(axis=1))
+
+    # Ланцюговий: щоденні ланки з вагами попереднього дня
+    linked = known[1:] & known[:-1]
+    links = _ratio(
+        (p_filled[1:] * q[:-1] * linked).sum(axis=1),
+        (p_filled[:-1] * q[:-1] * linked).sum(axis=1),
+    )
+    chain = np.concatenate([[1.0], np.cumprod(np.nan_to_num(links, nan=1.0))])
+
+    return pd.DataFrame({
+        INDEX_FORMULAS["laspeyres"]: laspeyres * 100,
+        INDEX_FORMULAS["paasche"]: paasche * 100,
+        INDEX_FORMULAS["chain"]: chain * 100,
+        "Товарів у кошику": (matched & (q0 > 0)).sum(axis=1),
+    }, index=prices.index)
+
+
+def rebase(frame, start_date, end_date):
+    """Зріз за датами, перебазований до 100 на перший день зрізу."""
+    window = frame.loc[pd.to_datetime(start_date):pd.to_datetime(end_date)]
+    if window.empty:
+        return window
+    first = window.bfill().iloc[0]
+    return window / first.where(first != 0) * 100
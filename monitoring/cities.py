@@ -0,0 +1,20 @@
+"""Реєстр міст і їхніх таблиць Google Sheets (ID таблиць)."""
+
+CITIES = {
+    "kyiv": {
+        "name": "Київ",
+        "prices": "1IdRGszdGFp9cqn3gD5bD1UJmUMSEe088Ov4T_7_GRn4",
+        "quantities": "1v_3O4PpGVFTji4YQvJEdsyJ3Dcx5Sqtjp7QvrqH36bk",
+    },
+    "zaporizhzhia": {
+        "name": "Запоріжжя",
+        "prices": "1_GXjF9kwPevi2GQC4kJ2SL8UTH-V3XWKYfgFLugdxzk",
+        "quantities": "1SuqdDLAP-DL2bjv998lI6xG40R06GHfhXnHiZ2SqoxI",
+    },
+}
+
+# Тип таблиці -> (назва стовпця значень, чи замінювати відсутні значення нулем)
+KINDS = {
+    "prices": ("Ціна", False),
+    "quantities": ("Кількість", True),
+}
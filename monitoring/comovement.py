@@ -0,0 +1,135 @@
+"""Спільна динаміка товарів: кореляція денних змін усіх товарів міста.
+
+Ціни переносяться вперед з останнього відомого дня, денні зміни
+центруються і нормуються, а пропуски стають нулями. Тоді кореляції всіх пар
+(зокрема із запізненням) - це кілька матричних добутків над масивом
+дата × товар, а спільні дні для кожної пари рахуються тими самими добутками масок.
+"""
+import numpy as np
+import pandas as pd
+
+# Мінімум спільних днів, щоб кореляції пари можна було довіряти
+MIN_OVERLAP_DAYS = 30
+MAX_LAG_DAYS = 14
+# Скільки стовпців матриці рахувати за один крок (між кроками - прогрес і скасування)
+BLOCK_PRODUCTS = 512
+# Скільки товарів показувати на тепловій карті
+MAX_HEATMAP_PRODUCTS = 40
+
+
+def daily_returns(wide):
+    """Відносні денні зміни таблиці дата × товар (NaN, де значення невідоме)."""
+    values = wide.ffill().to_numpy(dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = values[1:] / values[:-1] - 1
+    returns[~np.isfinite(returns)] = np.nan
+    return returns
+
+
+def _standardize(returns):
+    """Центровані й нормовані зміни (пропуски - 0) і маска відомих днів."""
+    known = ~np.isnan(returns)
+    counts = known.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(known, returns, 0).sum(axis=0) / counts
+        centered = np.where(known, returns - mean, 0)
+        scale = np.sqrt((centered ** 2).sum(axis=0) / counts)
+        scaled = np.where(scale > 0, centered / scale, 0)
+    return scaled.astype(np.float32), known.astype(np.float32)
+
+
+def correlation_matrix(returns, lag=0, min_overlap=MIN_OVERLAP_DAYS, report=None):
+    """Кореляції змін товару i з днем t і товару j з днем t + lag для всіх пар.
+
+    Матриця рахується блоками по BLOCK_PRODUCTS стовпців; після кожного блоку
+    викликається report(частка виконаного), якщо його передано.
+    Повертає матрицю кореляцій (float32) і кількість спільних днів кожної пари.
+    """
+    x, known = _standardize(returns)
+    if lag:
+        x_lead, known_lead = x[lag:], known[lag:]
+        x, known = x[:-lag], known[:-lag]
+    else:
+        x_lead, known_lead = x, known
+
+    n = x.shape[1]
+    corr = np.empty((n, n), dtype=np.float32)
+    overlap = np.empty((n, n), dtype=np.float32)
+    squares = x ** 2
+    for start in range(0, n, BLOCK_PRODUCTS):
+        block = slice(start, start + BLOCK_PRODUCTS)
+        # Пропуски дорівнюють нулю, тому добутки рахують лише спільні дні пари
+        overlap[:, block] = known.T @ known_lead[:, block]
+        left = squares.T @ known_lead[:, block]
+        right = known.T @ (x_lead[:, block] ** 2)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr[:, block] = (x.T @ x_lead[:, block]) / np.sqrt(left * right)
+        if report is not None:
+            report(min(start + BLOCK_PRODUCTS, n) / n)
+
+    corr[(overlap < min_overlap) | ~np.isfinite(corr)] = np.nan
+    np.clip(corr, -1, 1, out=corr)
+    return corr, overlap
+
+
+def top_pairs(corr, products, count=20, symmetric=True):
+    """Пари різних товарів з найбільшою кореляцією.
+
+    Для кореляцій із запізненням (symmetric=False) пара впорядкована: зміни
+    першого товару передують змінам другого.
+    """
+    scores = np.nan_to_num(corr.astype(np.float64), nan=-np.inf)
+    hidden = np.tril_indices_from(scores) if symmetric else np.diag_indices_from(scores)
+    scores[hidden] = -np.inf
+    flat = scores.ravel()
+    count = min(count, int(np.isfinite(flat).sum()))
+    if count == 0:
+        return pd.DataFrame(columns=["Товар 1", "Товар 2", "Кореляція"])
+    best = np.argpartition(flat, -count)[-count:]
+    best = best[np.argsort(flat[best])[::-1]]
+    rows, columns = np.unravel_index(best, corr.shape)
+    return pd.DataFrame({
+        "Товар 1": products[rows],
+        "Товар 2": products[columns],
+        "Кореляція": flat[best].round(3),
+    })
+
+
+def neighbours(corr, positions, limit=MAX_HEATMAP_PRODUCTS):
+    """Обрані товари і товари, найсильніше пов'язані з ними, не більше limit."""
+    chosen = list(dict.fromkeys(positions))[:limit]
+    if len(chosen) >= limit or not chosen:
+        return chosen
+    strength = np.nanmax(np.abs(np.nan_to_num(corr[chosen], nan=0)), axis=0)
+    strength[chosen] = -1
+    extra = np.argsort(strength)[::-1][:limit - len(chosen)]
+    return chosen + [int(position) for position in extra if strength[position] > 0]
+
+
+def cluster_order(corr):
+    """Порядок товарів за ієрархічною кластеризацією (середній зв'язок, відстань 1 - кореляція)."""
+    n = len(corr)
+    if n < 3:
+        return list(range(n))
+
+    # Для кореляцій із запізненням матриця несиметрична, відстань - за середнім обох напрямків
+    corr = np.nan_to_num(corr.astype(np.float64), nan=0)
+    distance = 1 - (corr + corr.T) / 2
+    np.fill_diagonal(distance, np.inf)
+    sizes = np.ones(n)
+    members = {position: [position] for position in range(n)}
+    active = np.ones(n, dtype=bool)
+
+    for _ in range(n - 1):
+        masked = np.where(active[:, None] & active[None, :], distance, np.inf)
+        a, b = np.unravel_index(np.argmin(masked), masked.shape)
+        a, b = min(a, b), max(a, b)
+        # Відстань до нового кластера - зважене середнє відстаней до двох злитих
+        merged = (sizes[a] * distance[a] + sizes[b] * distance[b]) / (sizes[a] + sizes[b])
+        distance[a], distance[:, a] = merged, merged
+        distance[a, a] = np.inf
+        sizes[a] += sizes[b]
+        active[b] = False
+        members[a] = members[a] + members.pop(b)
+
+    return members[int(np.flatnonzero(active)[0])]
@@ -0,0 +1,121 @@
+"""Експорт очищених даних у CSV, Parquet і Arrow IPC.
+
+Довга таблиця формується з кешованого блоку товар × дата і записується
+частинами (по кілька товарів), тому при
+записі у файл (командний рядок) пам'ять не зростає разом з обсягом експорту
+навіть для всієї історії. Кнопка завантаження на сторінці отримує весь файл
+у пам'яті (export_bytes), і Streamlit тримає його до кінця сесії, тому зі
+сторінки експортується не більше UI_MAX_ROWS рядків.
+
+Використання з командного рядка:
+
+    python -m monitoring.export kyiv prices parquet kyiv_prices.parquet --start 2024-01-01
+"""
+import argparse
+import io
+
+import pandas as pd
+
+CHUNK_ROWS = 100_000
+# Найбільший експорт для кнопки завантаження на сторінці, рядків
+UI_MAX_ROWS = 500_000
+
+# Формат -> (MIME-тип, розширення файлу)
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrow"),
+}
+
+
+def iter_chunks(block, products=None, start_date=None, end_date=None, chunk_rows=CHUNK_ROWS):
+    """Відфільтровані частини довгої таблиці, без довгої таблиці всього зрізу.
+
+    Для порожнього зрізу - одна порожня частина, щоб файл мав схему.
+    """
+    return block.iter_long(products, start_date, end_date, chunk_rows)
+
+
+def _open_writer(fmt, sink, schema):
+    import pyarrow as pa
+
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        return pq.ParquetWriter(sink, schema)
+    if fmt == "arrow":
+        return pa.ipc.new_stream(sink, schema)
+    if fmt == "csv":
+        import pyarrow.csv as pa_csv
+
+        return pa_csv.CSVWriter(sink, schema)
+    raise ValueError(f"Невідомий формат експорту: {fmt}")
+
+
+def write_export(chunks, fmt, sink, schema=None):
+    """Записує частини у sink (шлях або файловий об'єкт). Повертає кількість рядків."""
+    import pyarrow as pa
+
+    writer = None
+    rows = 0
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+            schema = table.schema
+            if fmt == "csv" and "Дата" in table.column_names:
+                # У CSV дати без часу, як у вихідних таблицях
+                position = table.column_names.index("Дата")
+                table = table.set_column(position, "Дата", table.column("Дата").cast(pa.date32()))
+            if writer is None:
+                writer = _open_writer(fmt, sink, table.schema)
+            writer.write_table(table)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def _with_progress(chunks, total_rows, report):
+    done = 0
+    for chunk in chunks:
+        yield chunk
+        done += len(chunk)
+        report(min(done / max(total_rows, 1), 1.0))
+
+
+def export_bytes(block, fmt, products=None, start_date=None, end_date=None, report=None):
+    """Експорт у пам'ять для кнопки завантаження (увесь файл - в одному bytes).
+
+    report(частка виконаного) викликається після кожної частини, якщо його передано.
+    """
+    sink = io.BytesIO()
+    chunks = iter_chunks(block, products, start_date, end_date)
+    if report is not None:
+        chunks = _with_progress(chunks, block.cells, report)
+    write_export(chunks, fmt, sink)
+    return sink.getvalue()
+
+
+def main(argv=None):
+    from monitoring.cities import CITIES, KINDS
+    from monitoring.pipeline import city_table
+
+    parser = argparse.ArgumentParser(description="Експорт очищених даних моніторингу цін")
+    parser.add_argument("city", choices=list(CITIES))
+    parser.add_argument("kind", choices=list(KINDS))
+    parser.add_argument("format", choices=list(EXPORT_FORMATS))
+    parser.add_argument("output")
+    parser.add_argument("--start", help="Початкова дата (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Кінцева дата (YYYY-MM-DD)")
+    parser.add_argument("--product", action="append", dest="products", help="Товар (можна повторювати)")
+    args = parser.parse_args(argv)
+
+    block, _, version = city_table(args.city, args.kind)
+    chunks = iter_chunks(block, args.products, args.start, args.end)
+    rows = write_export(chunks, args.format, args.output)
+    print(f"Експортовано {rows} рядків (версія даних {version}) у {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Локальна заміна GSheetsConnection із синтетичними таблицями.
+
+Вмикається змінною середовища PRICE_MONITORING_FAKE_SHEETS=1 (навантажувальні
+тести, розробка без доступу до Google). Таблиця однозначно визначається її ID,
+тому всі сесії бачать однакові дані.
+"""
+import os
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+from streamlit.connections import BaseConnection
+
+FAKE_PRODUCTS = int(os.environ.get("PRICE_MONITORING_FAKE_PRODUCTS", 200))
+FAKE_DAYS = int(os.environ.get("PRICE_MONITORING_FAKE_DAYS", 365))
+# Імітація затримки Google Sheets API (секунди)
+FAKE_LATENCY = float(os.environ.get("PRICE_MONITORING_FAKE_LATENCY", 0))
+FAKE_END_DATE = "2025-06-30"
+
+CATEGORIES = ["Молочні продукти", "Хліб", "М'ясо", "Овочі", "Крупи", "Напої"]
+NAMES = ["Молоко", "Кефір", "Батон", "Ковбаса", "Картопля", "Гречка", "Рис", "Сік", "Сир", "Яйця"]
+BRANDS = ["Галичина", "Яготинське", "Київхліб", "Глобино", "Сандора", "Президент"]
+
+
+def synthetic_sheet(spreadsheet, products=FAKE_PRODUCTS, days=FAKE_DAYS):
+    """Широка таблиця як у Google Sheets: id, Товар, Категорія і стовпці дат DD.MM.YYYY."""
+    rng = np.random.default_rng(zlib.crc32(str(spreadsheet).encode()))
+    dates = pd.date_range(end=FAKE_END_DATE, periods=days, freq="D")
+
+    # Ціни змінюються рідко: випадкові стрибки на тлі довгих незмінних відрізків
+    jumps = rng.normal(0, 0.05, (products, days)) * (rng.random((products, days)) < 0.05)
+    values = rng.uniform(20, 300, (products, 1)) * np.exp(np.cumsum(jumps, axis=1))
+    cells = np.char.replace(np.round(values, 2).astype(str), ".", ",").astype(object)
+    cells[rng.random(cells.shape) < 0.1] = ""
+
+    sheet = pd.DataFrame({
+        "id": np.arange(1, products + 1),
+        "Товар": [
+            f"{NAMES[i % len(NAMES)]} {BRANDS[(i // len(NAMES)) % len(BRANDS)]} №{i + 1}" for i in range(products)
+        ],
+        "Категорія": [CATEGORIES[i % len(CATEGORIES)] for i in range(products)],
+    })
+    return pd.concat([sheet, pd.DataFrame(cells, columns=dates.strftime("%d.%m.%Y"))], axis=1)
+
+
+class FakeSheetsConnection(BaseConnection):
+    def _connect(self, **kwargs):
+        return None
+
+    def read(self, spreadsheet=None, usecols=None, ttl=None, **options):
+        if FAKE_LATENCY:
+            time.sleep(FAKE_LATENCY)
+        data = synthetic_sheet(spreadsheet)
+        return data[usecols] if usecols is not None else data
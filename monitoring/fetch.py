@@ -0,0 +1,181 @@
+"""Завантаження таблиць з урахуванням квоти Google Sheets API.
+
+- Один запит на таблицю одночасно для всього процесу: сесії, які прийшли під час
+  завантаження, чекають на його результат (single-flight).
+- Бюджет запитів - "відро з токенами", спільне для всіх таблиць.
+- Повторні спроби з експоненційною затримкою при 429 та тимчасових помилках.
+- Якщо завантажити не вдалося, повертається остання успішна копія (застарілі дані).
+"""
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Скільки секунд дані вважаються свіжими
+FRESH_SECONDS = 600
+# Через скільки секунд після невдачі знову пробувати оновити застарілі дані
+STALE_RETRY_SECONDS = 60
+
+# Бюджет запитів: у середньому REQUESTS_PER_MINUTE, не більше BURST поспіль
+REQUESTS_PER_MINUTE = 30
+BURST = 5
+# Скільки чекати на вільний токен, перш ніж вважати квоту вичерпаною
+QUOTA_WAIT_SECONDS = 10
+
+MAX_ATTEMPTS = 4
+BACKOFF_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 16.0
+
+
+class QuotaExceeded(RuntimeError):
+    pass
+
+
+class TokenBucket:
+    def __init__(self, rate_per_second, capacity):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, timeout=QUOTA_WAIT_SECONDS):
+        """Забирає один токен, чекаючи не довше timeout секунд."""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            if now + wait > deadline:
+                raise QuotaExceeded("Вичерпано бюджет запитів до Google Sheets API")
+            time.sleep(wait)
+
+
+class SingleFlight:
+    """Об'єднує одночасні виклики з однаковим ключем в один."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {"done": threading.Event(), "result": None, "error": None}
+
+        if not leader:
+            call["done"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"]
+
+        try:
+            call["result"] = func()
+            return call["result"]
+        except BaseException as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call["done"].set()
+
+
+bucket = TokenBucket(REQUESTS_PER_MINUTE / 60, BURST)
+_flight = SingleFlight()
+_cache_lock = threading.Lock()
+# Таблиця -> {"value", "fetched_at", "failed_at", "error", "expired"}
+_cache = {}
+
+
+def _is_retryable(error):
+    """429, помилки сервера 5xx та мережеві збої варто повторити."""
+    if isinstance(error, (ConnectionError, TimeoutError, QuotaExceeded)):
+        return True
+    status = getattr(getattr(error, "response", None), "status_code", None) or getattr(error, "code", None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    text = str(error).lower()
+    return "429" in text or "quota" in text or "rate limit" in text
+
+
+def _fetch_with_retries(key, read):
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        try:
+            bucket.acquire()
+            return read()
+        except Exception as e:
+            if attempt == MAX_ATTEMPTS or not _is_retryable(e):
+                raise
+            delay = min(MAX_BACKOFF_SECONDS, BACKOFF_SECONDS * 2 ** (attempt - 1))
+            delay *= random.uniform(0.5, 1.5)
+            logger.warning("Завантаження %s не вдалося (%s), повтор через %.1f с", key, e, delay)
+            time.sleep(delay)
+
+
+def _refresh(key, read):
+    try:
+        value = _fetch_with_retries(key, read)
+    except Exception as e:
+        with _cache_lock:
+            entry = _cache.get(key)
+            if entry is None:
+                raise
+            entry["failed_at"] = time.monotonic()
+            entry["error"] = e
+        logger.warning("Використовуються застарілі дані для %s: %s", key, e)
+        return entry["value"]
+
+    with _cache_lock:
+        _cache[key] = {
+            "value": value, "fetched_at": time.monotonic(), "failed_at": None, "error": None, "expired": False
+        }
+    return value
+
+
+def fetch(key, read):
+    """Повертає результат read() для ключа з кешем, single-flight і запасною копією.
+
+    read викликається без аргументів і лише тоді, коли даних немає або вони
+    застаріли (і після останньої невдачі минуло STALE_RETRY_SECONDS).
+    """
+    now = time.monotonic()
+    with _cache_lock:
+        entry = _cache.get(key)
+    if entry is not None:
+        fresh = not entry["expired"] and now - entry["fetched_at"] < FRESH_SECONDS
+        cooling_down = entry["failed_at"] is not None and now - entry["failed_at"] < STALE_RETRY_SECONDS
+        if fresh or cooling_down:
+            return entry["value"]
+
+    return _flight.do(key, lambda: _refresh(key, read))
+
+
+def status(key):
+    """Стан даних таблиці: вік у секундах і помилка останнього оновлення, якщо дані застарілі."""
+    with _cache_lock:
+        entry = _cache.get(key)
+    if entry is None:
+        return None
+    return {"age": time.monotonic() - entry["fetched_at"], "error": entry["error"]}
+
+
+def invalidate(key=None):
+    """Позначає дані застарілими, щоб наступне звернення їх оновило."""
+    with _cache_lock:
+        keys = [key] if key is not None else list(_cache)
+        for item in keys:
+            if item in _cache:
+                _cache[item]["expired"] = True
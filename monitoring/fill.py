@@ -0,0 +1,83 @@
+"""Стратегії заповнення пропусків у денних рядах товарів.
+
+Усі стратегії працюють з "широкою" таблицею (індекс - суцільний ряд дат,
+стовпці - товари) і застосовуються одним векторним проходом до всіх товарів.
+"""
+import pandas as pd
+
+# Максимальна довжина ряду, щоб уникнути зависання на великих діапазонах
+MAX_DAYS = 731
+
+DEFAULT_STRATEGY = "limit"
+DEFAULT_LIMIT_DAYS = 30
+
+
+def _fill_none(wide, limit_days):
+    return wide
+
+
+def _fill_locf(wide, limit_days):
+    return wide.ffill()
+
+
+def _fill_linear(wide, limit_days):
+    # Інтерполюємо лише між відомими точками, краї не вигадуємо
+    return wide.interpolate(method="linear", limit_area="inside")
+
+
+def _fill_limit(wide, limit_days):
+    return wide.bfill(limit=limit_days).ffill(limit=limit_days)
+
+
+def _fill_mean(wide, limit_days):
+    return wide.fillna(wide.mean())
+
+
+FILL_STRATEGIES = {
+    "none": _fill_none,
+    "locf": _fill_locf,
+    "linear": _fill_linear,
+    "limit": _fill_limit,
+    "mean": _fill_mean,
+}
+
+FILL_LABELS = {
+    "none": "Без заповнення",
+    "locf": "Останнє відоме значення",
+    "linear": "Лінійна інтерполяція",
+    "limit": "Найближче значення (обмеження в днях)",
+    "mean": "Середнє значення товару",
+}
+
+
+def daily_frame(wide, start_date, end_date, columns=None):
+    """Приводить таблицю дата × товар до суцільного денного ряду.
+
+    columns - порядок товарів; дати і товари переставляються однією копією.
+    Повертає таблицю та ознаку того, що діапазон було обрізано до MAX_DAYS.
+    """
+    days = pd.date_range(start=start_date, end=end_date, freq="D", name="Дата")
+    truncated = len(days) > MAX_DAYS
+    if truncated:
+        days = days[:MAX_DAYS]
+    return wide.reindex(index=days, columns=columns), truncated
+
+
+def fill_gaps(wide, strategy=DEFAULT_STRATEGY, limit_days=DEFAULT_LIMIT_DAYS):
+    """Заповнює пропуски обраною стратегією.
+
+    Повертає заповнену таблицю і частку заповнених (не спостережених) днів
+    для кожного товару.
+    """
+    if strategy not in FILL_STRATEGIES:
+        raise ValueError(f"Невідома стратегія заповнення: {strategy}")
+
+    observed = wide.notna()
+    filled = FILL_STRATEGIES[strategy](wide, limit_days)
+
+    if len(wide.index) == 0:
+        filled_fraction = pd.Series(0.0, index=wide.columns)
+    else:
+        filled_fraction = (filled.notna() & ~observed).sum() / len(wide.index)
+
+    return filled, filled_fraction
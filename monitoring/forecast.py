@@ -0,0 +1,120 @@
+"""Пакетний короткостроковий прогноз для всіх товарів одразу.
+
+Моделі (просте експоненційне згладжування і сезонна наївна з тижневим
+періодом) рахуються векторно по матриці дата × товар: цикл іде лише по днях,
+а всі товари і всі варіанти параметра згладжування обробляються разом.
+"""
+import numpy as np
+import pandas as pd
+
+FORECAST_DAYS = 14
+SEASON_DAYS = 7
+ALPHAS = np.array([0.1, 0.2, 0.3, 0.5, 0.7, 0.9])
+# Межі інтервалу прогнозу ~95%
+Z_SCORE = 1.96
+
+FORECAST_METHODS = {
+    "auto": "Автоматичний вибір",
+    "ses": "Експоненційне згладжування",
+    "seasonal_naive": "Сезонна наївна (тиждень)",
+}
+
+
+def _fit_ses(values):
+    """Експоненційне згладжування для всіх товарів і всіх ALPHAS одночасно.
+
+    Пропуски не оновлюють рівень. Повертає для кожного товару рівень, найкращу
+    alpha, стандартне відхилення і середню абсолютну похибку прогнозу на один крок.
+    """
+    n_alphas, n_products = len(ALPHAS), values.shape[1]
+    alphas = ALPHAS[:, None]
+    level = np.full((n_alphas, n_products), np.nan)
+    sse = np.zeros((n_alphas, n_products))
+    errors = np.zeros(n_products)
+    abs_error = np.zeros((n_alphas, n_products))
+
+    for row in values:
+        observed = ~np.isnan(row)
+        started = ~np.isnan(level[0])
+        update = observed & started
+        error = np.where(update, row - level, 0.0)
+        sse += error ** 2
+        abs_error += np.abs(error)
+        errors += update
+        level = np.where(update, level + alphas * error, level)
+        level = np.where(observed & ~started, row, level)
+
+    best = sse.argmin(axis=0)
+    columns = np.arange(n_products)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sigma = np.sqrt(sse[best, columns] / np.maximum(errors - 1, 1))
+        mae = abs_error[best, columns] / errors
+    return level[best, columns], ALPHAS[best], sigma, mae
+
+
+def _fit_seasonal_naive(values):
+    """Сезонна наївна модель: значення тиждень тому (на заповненому вперед ряду)."""
+    filled = pd.DataFrame(values).ffill().to_numpy()
+    last_season = filled[-SEASON_DAYS:]
+    if len(last_season) < SEASON_DAYS:
+        last_season = np.vstack([np.full((SEASON_DAYS - len(last_season), values.shape[1]), np.nan), last_season])
+
+    residuals = filled[SEASON_DAYS:] - filled[:-SEASON_DAYS]
+    with np.errstate(invalid="ignore"):
+        valid = ~np.isnan(residuals)
+        counts = valid.sum(axis=0)
+        sigma = np.sqrt(np.where(valid, residuals ** 2, 0).sum(axis=0) / np.maximum(counts - 1, 1))
+        mae = np.where(valid, np.abs(residuals), 0).sum(axis=0) / counts
+    return last_season, sigma, mae
+
+
+def forecast_all(wide, horizon=FORECAST_DAYS, method="auto"):
+    """Прогноз для всіх стовпців таблиці дата × товар.
+
+    Повертає довгу таблицю: товар, Дата, Прогноз, Нижня межа, Верхня межа, Модель.
+    """
+    if method not in FORECAST_METHODS:
+        raise ValueError(f"Невідомий метод прогнозу: {method}")
+
+    product_column = wide.columns.name or "Товар"
+    if wide.empty:
+        return pd.DataFrame(columns=[product_column, "Дата", "Прогноз", "Нижня межа", "Верхня межа", "Модель"])
+
+    values = wide.to_numpy(dtype=float)
+    steps = np.arange(1, horizon + 1)[:, None]
+
+    level, alpha, ses_sigma, ses_mae = _fit_ses(values)
+    ses_mean = np.broadcast_to(level, (horizon, len(level)))
+    # Дисперсія прогнозу SES зростає як 1 + (h - 1) * alpha^2
+    ses_spread = Z_SCORE * ses_sigma * np.sqrt(1 + (steps - 1) * alpha ** 2)
+
+    last_season, naive_sigma, naive_mae = _fit_seasonal_naive(values)
+    naive_mean = last_season[(steps.ravel() - 1) % SEASON_DAYS]
+    naive_spread = Z_SCORE * naive_sigma * np.sqrt((steps - 1) // SEASON_DAYS + 1)
+
+    if method == "ses":
+        use_naive = np.zeros(len(level), dtype=bool)
+    elif method == "seasonal_naive":
+        use_naive = np.ones(len(level), dtype=bool)
+    else:
+        use_naive = np.nan_to_num(naive_mae, nan=np.inf) < np.nan_to_num(ses_mae, nan=np.inf)
+
+    mean = np.where(use_naive, naive_mean, ses_mean)
+    spread = np.where(use_naive, naive_spread, ses_spread)
+    spread = np.nan_to_num(spread)
+
+    days = pd.date_range(wide.index[-1] + pd.Timedelta(days=1), periods=horizon, freq="D")
+    models = np.where(use_naive, "seasonal_naive", "ses")
+
+    result = pd.DataFrame({
+        product_column: np.tile(wide.columns.to_numpy(), horizon),
+        "Дата": np.repeat(days, len(wide.columns)),
+        "Прогноз": mean.ravel(),
+        "Нижня межа": (mean - spread).ravel(),
+        "Верхня межа": (mean + spread).ravel(),
+        "Модель": np.tile(models, horizon),
+    })
+    # Ціни і кількість не бувають від'ємними
+    result["Нижня межа"] = result["Нижня межа"].clip(lower=0)
+    result = result.dropna(subset=["Прогноз"])
+    return result.sort_values(by=[product_column, "Дата"], kind="stable").reset_index(drop=True)
@@ -0,0 +1,177 @@
+"""Історія змін таблиць: журнал відмінностей між завантаженнями.
+
+Для кожної таблиці зберігається останній стан (snapshot.parquet), журнал
+завантажень (ingests.jsonl), для кожного завантаження окремий файл лише зі
+зміненими клітинками (diffs/<номер>.parquet, значення "Було" і "Стало") і
+ідентифікаційні стовпці товарів цього завантаження (products/<номер>.parquet:
+категорія тощо, по одному рядку на товар, у порядку стовпців таблиці).
+Журнали, записані до появи products/, використовують products.parquet з
+останніми відомими значеннями для кожного товару.
+Файли відмінностей тільки додаються. Стан на будь-яке минуле завантаження
+відновлюється з останнього стану відкатом відмінностей у зворотному порядку.
+Запис і читання стану виконуються під файловим блокуванням (.lock у каталозі
+таблиці), бо таблицю можуть записувати кілька процесів сервера.
+"""
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+DATA_DIR = os.environ.get("PRICE_MONITORING_DATA", ".data")
+HISTORY_DIR = os.path.join(DATA_DIR, "history")
+
+KEYS = ["Товар", "Дата"]
+
+
+def _sheet_dir(spreadsheet):
+    return os.path.join(HISTORY_DIR, spreadsheet)
+
+
+@contextmanager
+def _sheet_lock(spreadsheet, exclusive=True):
+    """Блокування файлів таблиці між потоками і процесами (сервер, API, експорт).
+
+    flock діє на окремий відкритий файл, тому виключає і потоки одного процесу.
+    """
+    sheet_dir = _sheet_dir(spreadsheet)
+    os.makedirs(sheet_dir, exist_ok=True)
+    with open(os.path.join(sheet_dir, ".lock"), "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _read_snapshot(spreadsheet):
+    path = os.path.join(_sheet_dir(spreadsheet), "snapshot.parquet")
+    if not os.path.exists(path):
+        return pd.DataFrame({"Товар": pd.Series(dtype=object), "Дата": pd.Series(dtype="datetime64[ns]"),
+                             "Значення": pd.Series(dtype=float)})
+    return pd.read_parquet(path)
+
+
+def _products_path(spreadsheet, ingest_id):
+    return os.path.join(_sheet_dir(spreadsheet), "products", f"{ingest_id:06d}.parquet")
+
+
+def _read_products(spreadsheet, ingest_id):
+    path = _products_path(spreadsheet, ingest_id)
+    if not os.path.exists(path):
+        path = os.path.join(_sheet_dir(spreadsheet), "products.parquet")
+    if not os.path.exists(path):
+        return None
+    return pd.read_parquet(path)
+
+
+def _product_attributes(long_df, value_name, product_column):
+    """Ідентифікаційні стовпці (крім дати і значення) по одному рядку на товар."""
+    columns = [column for column in long_df.columns if column not in ("Дата", value_name)]
+    products = long_df[columns].drop_duplicates(subset=[product_column], keep="last")
+    products = products.rename(columns={product_column: "Товар"}).reset_index(drop=True)
+    for column in products.columns:
+        # Змішані числа і текст у стовпцях таблиці не записуються в Parquet
+        if products[column].dtype == object:
+            products[column] = products[column].where(products[column].isna(), products[column].astype(str))
+    return products
+
+
+def list_ingests(spreadsheet):
+    """Журнал завантажень таблиці, від найстарішого до найновішого."""
+    path = os.path.join(_sheet_dir(spreadsheet), "ingests.jsonl")
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def cell_diff(previous, current):
+    """Клітинки, що з'явилися, зникли або змінили значення (Товар, Дата, Було, Стало)."""
+    merged = previous.merge(current, on=KEYS, how="outer", suffixes=("_old", "_new"))
+    old = merged["Значення_old"].to_numpy(dtype=float)
+    new = merged["Значення_new"].to_numpy(dtype=float)
+    same = (old == new) | (np.isnan(old) & np.isnan(new))
+    return pd.DataFrame({
+        "Товар": merged["Товар"].to_numpy()[~same],
+        "Дата": merged["Дата"].to_numpy()[~same],
+        "Було": old[~same],
+        "Стало": new[~same],
+    })
+
+
+def record_ingest(spreadsheet, version, long_df, value_name, product_column="Товар"):
+    """Записує відмінності поточної версії даних від попереднього завантаження.
+
+    Повторне завантаження тієї самої версії нічого не записує. Повертає запис
+    журналу для цієї версії. Читання журналу, розрахунок відмінностей і запис
+    виконуються під блокуванням файлів таблиці.
+    """
+    with _sheet_lock(spreadsheet):
+        ingests = list_ingests(spreadsheet)
+        if ingests and ingests[-1]["version"] == version:
+            return ingests[-1]
+
+        current = long_df[[product_column, "Дата", value_name]].set_axis(["Товар", "Дата", "Значення"], axis=1)
+        diff = cell_diff(_read_snapshot(spreadsheet), current)
+
+        sheet_dir = _sheet_dir(spreadsheet)
+        os.makedirs(os.path.join(sheet_dir, "diffs"), exist_ok=True)
+        os.makedirs(os.path.join(sheet_dir, "products"), exist_ok=True)
+
+        ingest = {
+            "id": len(ingests) + 1,
+            "version": version,
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "changed": len(diff),
+            "cells": len(current),
+        }
+        diff.to_parquet(os.path.join(sheet_dir, "diffs", f"{ingest['id']:06d}.parquet"), index=False)
+        _product_attributes(long_df, value_name, product_column).to_parquet(
+            _products_path(spreadsheet, ingest["id"]), index=False
+        )
+
+        # Останній стан замінюємо атомарно, журнал тільки доповнюємо
+        snapshot_path = os.path.join(sheet_dir, "snapshot.parquet")
+        current.to_parquet(snapshot_path + ".tmp", index=False)
+        os.replace(snapshot_path + ".tmp", snapshot_path)
+        with open(os.path.join(sheet_dir, "ingests.jsonl"), "a", encoding="utf-8") as file:
+            file.write(json.dumps(ingest, ensure_ascii=False) + "\n")
+
+        return ingest
+
+
+def read_diff(spreadsheet, ingest_id):
+    return pd.read_parquet(os.path.join(_sheet_dir(spreadsheet), "diffs", f"{ingest_id:06d}.parquet"))
+
+
+def as_of(spreadsheet, ingest_id, value_name="Значення", product_column="Товар"):
+    """Стан таблиці (довгий формат) на момент завантаження ingest_id.
+
+    Ідентифікаційні стовпці товарів (категорія тощо) додаються з атрибутів
+    цього завантаження, тож стовпці і їхній порядок такі самі, як у довгої
+    таблиці, з якої його записано.
+    """
+    # Останній стан і журнал мають належати одному завантаженню
+    with _sheet_lock(spreadsheet, exclusive=False):
+        ingests = list_ingests(spreadsheet)
+        if not any(ingest["id"] == ingest_id for ingest in ingests):
+            raise KeyError(f"Немає завантаження {ingest_id} для таблиці {spreadsheet}")
+
+        state = _read_snapshot(spreadsheet).set_index(KEYS)["Значення"]
+        for ingest in reversed(ingests):
+            if ingest["id"] <= ingest_id:
+                break
+            diff = read_diff(spreadsheet, ingest["id"]).set_index(KEYS)["Було"]
+            # Відкат: повертаємо старі значення, клітинки, яких раніше не було, видаляємо
+            state = pd.concat([state.drop(diff.index, errors="ignore"), diff.dropna()])
+        products = _read_products(spreadsheet, ingest_id)
+
+    result = state.rename(value_name).reset_index()
+    if products is not None:
+        result = result.merge(products, on="Товар", how="left")[[*products.columns, "Дата", value_name]]
+    result = result.rename(columns={"Товар": product_column})
+    return result.sort_values(by=[product_column, "Дата"], kind="stable").reset_index(drop=True)
@@ -0,0 +1,192 @@
+"""Перевірка схеми і очищення таблиці один раз на версію даних.
+
+Результат - блок товар × дата (monitoring.wide.WideBlock) без дублікатів пар
+(Дата, товар), з товарами і датами за зростанням, та звіт про якість даних,
+який показується користувачу. Таблиця очищується у своєму широкому вигляді:
+клітинки дат розбираються одним масивом, без перетворення в довгий формат.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+from monitoring.wide import WideBlock
+
+STRICT_DATE_RE = re.compile(r'^\d{2}\.\d{2}\.\d{4}$')
+# Дати, записані з іншими роздільниками або без нулів на початку: 1.2.2024, 01/02/24
+LOOSE_DATE_RE = re.compile(r'^\s*(\d{1,2})[./-](\d{1,2})[./-](\d{2}|\d{4})\s*$')
+# pandas додає суфікс .1, .2 ... до повторюваних назв стовпців
+DUPLICATE_DATE_RE = re.compile(r'^(\d{2}\.\d{2}\.\d{4})\.\d+$')
+
+MAX_SAMPLES = 10
+
+
+class SchemaError(ValueError):
+    pass
+
+
+def _parse_header(column):
+    """Дата заголовка, ознака "виправленого" формату, або None, якщо це не дата."""
+    if isinstance(column, pd.Timestamp):
+        return column.normalize(), False
+    if not isinstance(column, str):
+        return None
+
+    if STRICT_DATE_RE.match(column):
+        return pd.to_datetime(column, format="%d.%m.%Y", errors="coerce"), False
+
+    match = LOOSE_DATE_RE.match(column)
+    if match:
+        day, month, year = (int(part) for part in match.groups())
+        if year < 100:
+            year += 2000
+        try:
+            return pd.Timestamp(year=year, month=month, day=day), True
+        except ValueError:
+            return pd.NaT, True
+    return None
+
+
+def split_columns(columns):
+    """Розділяє заголовки на дати, некоректні дати і ідентифікаційні стовпці.
+
+    Повертає (словник стовпець -> дата, виправлені, некоректні, повтори, id-стовпці).
+    """
+    dates, recovered, malformed, repeated, id_columns = {}, [], [], [], []
+    for column in columns:
+        duplicate = DUPLICATE_DATE_RE.match(column) if isinstance(column, str) else None
+        parsed = _parse_header(duplicate.group(1) if duplicate else column)
+        if parsed is None:
+            id_columns.append(column)
+            continue
+
+        date, loose = parsed
+        if pd.isna(date):
+            malformed.append(column)
+            continue
+        if duplicate:
+            repeated.append(column)
+        elif loose:
+            recovered.append(column)
+        dates[column] = date
+
+    return dates, recovered, malformed, repeated, id_columns
+
+
+def product_column_of(id_columns):
+    return "Товар" if "Товар" in id_columns else id_columns[0]
+
+
+def clean_sheet(data, value_name, missing_as_zero=False):
+    """Перевіряє схему, очищає значення і усуває дублікати.
+
+    Для цін клітинки без значення залишаються пропусками, для кількості -
+    замінюються нулем. Товари і дати, для яких немає жодного значення, до
+    блоку не входять. Повертає блок товар × дата і звіт про якість даних.
+    """
+    dates, recovered, malformed, repeated, id_columns = split_columns(data.columns)
+    if not dates:
+        raise SchemaError("Не знайдено стовпців з датами у форматі DD.MM.YYYY")
+    if not id_columns:
+        raise SchemaError("Не знайдено стовпця з назвами товарів")
+    product_column = product_column_of(id_columns)
+
+    # Рядки без назви товару не можна віднести до жодного ряду
+    missing_product = data[product_column].isna().to_numpy()
+    missing_products = int(missing_product.sum())
+    sheet = data[~missing_product] if missing_products else data
+    n_rows, n_columns = len(sheet), len(dates)
+
+    # Клітинки дат одним рядом у порядку стовпців (стовпець за стовпцем, як у melt)
+    cells = pd.Series(sheet[list(dates)].to_numpy(dtype=object).ravel(order="F"))
+
+    # Очищаємо значення (замінюємо коми на крапки і видаляємо нечислові символи)
+    raw = cells.astype(str).str.strip()
+    empty = cells.isna() | raw.isin(["", "nan", "None"])
+    values = pd.to_numeric(raw.str.replace(',', '.').str.replace(r'[^\d.]', '', regex=True), errors="coerce")
+    invalid = (~empty & values.isna()).to_numpy()
+    date_list = list(dates.values())
+    invalid_samples = [
+        (sheet[product_column].iloc[position % n_rows], date_list[position // n_rows].strftime('%d.%m.%Y'),
+         raw.iloc[position])
+        for position in np.flatnonzero(invalid)[:MAX_SAMPLES]
+    ]
+    invalid_cells = int(invalid.sum())
+    # Проміжні рядкові масиви більше не потрібні, звільняємо їх до побудови блоку
+    del cells, raw, empty, invalid
+
+    if missing_as_zero:
+        values.fillna(0, inplace=True)
+    values = values.to_numpy(dtype=float)
+
+    product_codes, products = pd.factorize(sheet[product_column], sort=True)
+    date_codes, block_dates = pd.factorize(pd.DatetimeIndex(date_list), sort=True)
+    product_of_cell = np.tile(product_codes, n_columns)
+    date_of_cell = np.repeat(date_codes, n_rows)
+    known = np.flatnonzero(~np.isnan(values))
+
+    # Дублікати (Дата, товар): перемагає останній рядок / останній стовпець таблиці
+    keys = product_of_cell[known] * len(block_dates) + date_of_cell[known]
+    _, last_reversed = np.unique(keys[::-1], return_index=True)
+    winners = known[len(keys) - 1 - last_reversed]
+    duplicates = len(keys) - len(winners)
+
+    block_values = np.full((len(products), len(block_dates)), np.nan)
+    block_values[product_of_cell[winners], date_of_cell[winners]] = values[winners]
+    del values, product_of_cell, date_of_cell
+
+    # Як у довгій таблиці: лише товари і дати, для яких є хоча б одне значення
+    has_value = ~np.isnan(block_values)
+    has_product, has_date = has_value.any(axis=1), has_value.any(axis=0)
+    if not has_product.all() or not has_date.all():
+        block_values = block_values[has_product][:, has_date]
+        products, block_dates = products[has_product], block_dates[has_date]
+
+    attributes = sheet[id_columns].drop_duplicates(subset=[product_column], keep="last")
+    attributes = attributes.set_index(product_column, drop=False).loc[products]
+    block = WideBlock(
+        np.asarray(products, dtype=object), pd.DatetimeIndex(block_dates, name="Дата"), block_values,
+        product_column, value_name, attributes
+    )
+
+    report = {
+        "product_column": product_column,
+        "products": int(data[product_column].nunique()),
+        "date_columns": len(dates),
+        "rows": block.cells,
+        "recovered_headers": recovered,
+        "malformed_headers": malformed,
+        "repeated_headers": repeated,
+        "missing_products": missing_products,
+        "invalid_cells": invalid_cells,
+        "invalid_samples": invalid_samples,
+        "duplicates": duplicates,
+    }
+    return block, report
+
+
+def report_messages(report):
+    """Повідомлення для користувача про знайдені і виправлені проблеми."""
+    messages = []
+    if report["malformed_headers"]:
+        messages.append(
+            f"Пропущено стовпці з некоректними датами: {', '.join(map(str, report['malformed_headers']))}."
+        )
+    if report["recovered_headers"]:
+        messages.append(
+            f"Дати в нестандартному форматі розпізнано: {', '.join(map(str, report['recovered_headers']))}."
+        )
+    if report["repeated_headers"]:
+        messages.append(
+            f"Повторювані стовпці дат (використано останній): {', '.join(map(str, report['repeated_headers']))}."
+        )
+    if report["missing_products"]:
+        messages.append(f"Пропущено {report['missing_products']} рядків без назви товару.")
+    if report["invalid_cells"]:
+        samples = "; ".join(f"{product} {date}: «{text}»" for product, date, text in report["invalid_samples"])
+        messages.append(f"Не вдалося розпізнати {report['invalid_cells']} значень (наприклад: {samples}).")
+    if report["duplicates"]:
+        messages.append(
+            f"Виявлено {report['duplicates']} дублікатів дат. Використовуються останні доступні значення."
+        )
+    return messages
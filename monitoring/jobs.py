@@ -0,0 +1,99 @@
+"""Фонові задачі для важких етапів (кореляції, великі таблиці змін, експорт).
+
+Задачі виконуються у спільному пулі потоків процесу: великі таблиці вже лежать у
+кеші процесу і не копіюються, а NumPy і pyarrow відпускають GIL під час
+обчислень, тож задачі різних сесій займають усі ядра. Сторінка не чекає на
+задачу: вона показує прогрес і кнопку скасування, а перезапуски фрагмента
+перевіряють стан задачі.
+
+Кожна задача має ключ вхідних даних. Якщо сесія запускає задачу з тим самим
+ім'ям, але іншим ключем (змінився вибір), стара задача скасовується. Етапи з
+кроками перевіряють скасування між кроками через report(); етап без кроків
+доробляє, але його результат відкидається.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from monitoring.memory import measure
+
+MAX_WORKERS = int(os.environ.get("PRICE_MONITORING_WORKERS", os.cpu_count() or 2))
+# Як часто сторінка перевіряє стан задачі, секунд
+POLL_SECONDS = 0.3
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    """Задача в пулі з прогресом (0..1), повідомленням і ознакою скасування."""
+
+    def __init__(self, name, input_key):
+        self.name = name
+        self.input_key = input_key
+        self.progress = 0.0
+        self.message = ""
+        self.started = time.monotonic()
+        self.future = None
+        # Пам'ять результату і пік під час виконання, виміряні в потоці задачі
+        self.retained = 0
+        self.peak = None
+        self._cancelled = threading.Event()
+
+    def report(self, fraction, message=None):
+        """Оновлює прогрес; викликається з задачі між кроками і перериває скасовану задачу."""
+        if self._cancelled.is_set():
+            raise JobCancelled(self.name)
+        self.progress = min(max(float(fraction), 0.0), 1.0)
+        if message is not None:
+            self.message = message
+
+    def run(self, func, *args, **kwargs):
+        result, self.retained, self.peak = measure(func, *args, report=self.report, **kwargs)
+        return result
+
+    def cancel(self):
+        self._cancelled.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def done(self):
+        return self.future.done()
+
+    def result(self):
+        return self.future.result()
+
+
+def _pool():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="job")
+        return _executor
+
+
+def submit(jobs, name, input_key, func, *args, **kwargs):
+    """Запускає func(*args, report=job.report, **kwargs) або повертає вже запущену задачу.
+
+    jobs - словник задач сесії (ім'я -> Job). Задача з тим самим ім'ям і іншим
+    ключем вхідних даних застаріла і скасовується. Скасована користувачем задача
+    з тим самим ключем не перезапускається, доки її не прибрати з jobs.
+    """
+    job = jobs.get(name)
+    if job is not None and job.input_key == input_key:
+        return job
+    if job is not None:
+        job.cancel()
+
+    job = jobs[name] = Job(name, input_key)
+    job.future = _pool().submit(job.run, func, *args, **kwargs)
+    return job
@@ -0,0 +1,269 @@
+"""Навантажувальний тест сторінок міст з кількома одночасними сесіями.
+
+Кожна сесія - окремий процес з AppTest зі справжнім скриптом сторінки і
+синтетичними таблицями (monitoring.fake_sheets): AppTest використовує
+глобальний для процесу Runtime Streamlit, тому кілька AppTest в одному
+інтерпретаторі заважали б один одному. Синтетичні таблиці визначаються ID
+таблиці і розмірами з PRICE_MONITORING_FAKE_*, тож усі процеси бачать однакові
+дані. Процес спершу прогріває власні кеші (без --cold), потім усі сесії
+одночасно відкривають сторінку і повторюють типові дії: зміну діапазону дат,
+пошук і вибір товарів, стратегію заповнення, прогноз. Дія вважається
+завершеною, коли завершено фонові задачі сесії і сторінку перезапущено з їхнім
+результатом. Для кожної кількості сесій виводяться перцентилі затримки,
+процесорний час і пам'ять.
+
+Кеші в кожному процесі свої, тому пам'ять на сесію включає і спільні для
+сервера таблиці, які справжній сервер тримає один раз.
+
+    python -m monitoring.loadtest --page kyiv --sessions 1 2 4 8 --interactions 10
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import resource
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from monitoring.fill import FILL_STRATEGIES
+from monitoring.jobs import POLL_SECONDS
+from monitoring.memory import session_totals
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = {
+    "kyiv": os.path.join(ROOT, "🏠Kyiv.py"),
+    "zaporizhzhia": os.path.join(ROOT, "pages", "🎖️Zaporizhzhia.py"),
+}
+COLUMNS = ["prices", "quantities"]
+SEARCH_WORDS = ["мол", "хліб", "сир", "гал", "кеф", "рис"]
+
+
+def _rss_bytes():
+    """Поточна резидентна пам'ять процесу (Linux), інакше пік."""
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class _MemorySampler(threading.Thread):
+    def __init__(self, interval=0.05):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = _rss_bytes()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.peak = max(self.peak, _rss_bytes())
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def _change_dates(at, prefix, rng):
+    widget = at.date_input(key=f"{prefix}_dates")
+    span = (widget.max - widget.min).days
+    start = widget.min + timedelta(days=rng.randint(0, max(span - 7, 0)))
+    end = min(widget.max, start + timedelta(days=rng.randint(7, max(span, 7))))
+    widget.set_value((start, end))
+
+
+def _search_and_select(at, prefix, rng):
+    at.text_input(key=f"{prefix}_search").input(rng.choice(SEARCH_WORDS))
+    at.run()
+    widget = at.multiselect(key=f"{prefix}_products")
+    candidates = [option for option in widget.options if option not in widget.value]
+    if candidates:
+        widget.select(rng.choice(candidates))
+
+
+def _change_fill(at, prefix, rng):
+    at.selectbox(key=f"{prefix}_fill_strategy").set_value(rng.choice(list(FILL_STRATEGIES)))
+
+
+def _toggle_forecast(at, prefix, rng):
+    widget = at.checkbox(key=f"{prefix}_forecast")
+    widget.set_value(not widget.value)
+
+
+ACTIONS = {
+    "dates": _change_dates,
+    "products": _search_and_select,
+    "fill": _change_fill,
+    "forecast": _toggle_forecast,
+}
+
+
+def _pending_jobs(state):
+    """Чи є в сесії незавершені фонові задачі (словники <колонка>_jobs)."""
+    return any(
+        not job.done() and not job.cancelled
+        for key, jobs in state.items() if key.endswith("_jobs")
+        for job in jobs.values()
+    )
+
+
+def _settle(at, timeout):
+    """Чекає на фонові задачі сесії і перезапускає сторінку, як фрагмент прогресу.
+
+    Таймери фрагментів AppTest не запускає, тому перезапуск робиться тут, доки
+    після нього не залишиться незавершених задач.
+    """
+    deadline = time.perf_counter() + timeout
+    while _pending_jobs(at.session_state):
+        if time.perf_counter() > deadline:
+            raise TimeoutError(f"Фонові задачі не завершились за {timeout} с")
+        time.sleep(POLL_SECONDS)
+        if not _pending_jobs(at.session_state):
+            at.run()
+
+
+def _error(at):
+    return at.exception[0].message if at.exception else None
+
+
+def run_session(script, city, interactions, seed, timeout=120):
+    """Одна сесія: відкриття сторінки і interactions випадкових дій.
+
+    Повертає список (дія, секунди, помилка або None) і найбільшу власну пам'ять сесії.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed)
+    timings = []
+
+    at = AppTest.from_file(script, default_timeout=timeout)
+    started = time.perf_counter()
+    try:
+        at.run()
+        _settle(at, timeout)
+        error = _error(at)
+    except Exception as e:
+        error = repr(e)
+    timings.append(("open", time.perf_counter() - started, error))
+    session_peak = session_totals(at.session_state)["own"]
+
+    for _ in range(interactions):
+        name = rng.choice(list(ACTIONS))
+        prefix = f"{city}_{rng.choice(COLUMNS)}"
+        started = time.perf_counter()
+        try:
+            ACTIONS[name](at, prefix, rng)
+            at.run()
+            _settle(at, timeout)
+            error = _error(at)
+        except Exception as e:
+            error = repr(e)
+        timings.append((name, time.perf_counter() - started, error))
+        session_peak = max(session_peak, session_totals(at.session_state)["own"])
+
+    return timings, session_peak
+
+
+def _session_process(script, city, interactions, seed, warm, barrier, results):
+    """Процес однієї сесії: прогрів кешів, очікування інших сесій і вимірювання."""
+    if warm:
+        from streamlit.testing.v1 import AppTest
+
+        at = AppTest.from_file(script, default_timeout=300)
+        at.run()
+        _settle(at, 300)
+
+    barrier.wait()
+    sampler = _MemorySampler()
+    rss_before = _rss_bytes()
+    cpu_before = time.process_time()
+    sampler.start()
+    try:
+        timings, session_peak = run_session(script, city, interactions, seed)
+    finally:
+        sampler.stop()
+    results.put({
+        "timings": timings,
+        "session": session_peak,
+        "cpu": time.process_time() - cpu_before,
+        "rss": sampler.peak,
+        "rss_growth": sampler.peak - rss_before,
+    })
+
+
+def run_level(city, sessions, interactions, seed=0, warm=True):
+    """Запускає sessions одночасних сесій в окремих процесах і збирає метрики."""
+    script = PAGES[city]
+    # Нові інтерпретатори без успадкованого Runtime і кешів батьківського процесу
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(sessions + 1)
+    queue = context.Queue()
+    processes = [
+        context.Process(
+            target=_session_process,
+            args=(script, city, interactions, seed + position, warm, barrier, queue),
+        )
+        for position in range(sessions)
+    ]
+    for process in processes:
+        process.start()
+
+    barrier.wait()
+    started = time.perf_counter()
+    # Результати забираються до join, щоб процеси не блокувались на повній черзі
+    results = [queue.get() for _ in processes]
+    wall = time.perf_counter() - started
+    for process in processes:
+        process.join()
+
+    timings = [timing for result in results for timing in result["timings"]]
+    latencies = np.array([seconds for _, seconds, _ in timings])
+    errors = [error for _, _, error in timings if error]
+    cpu = sum(result["cpu"] for result in results)
+
+    return {
+        "Сесій": sessions,
+        "Дій": len(timings),
+        "Помилок": len(errors),
+        "p50, мс": np.percentile(latencies, 50) * 1000,
+        "p95, мс": np.percentile(latencies, 95) * 1000,
+        "p99, мс": np.percentile(latencies, 99) * 1000,
+        "Макс., мс": latencies.max() * 1000,
+        "Дій/с": len(timings) / wall,
+        "CPU, с": cpu,
+        "CPU на сесію, с": cpu / sessions,
+        "Пік RSS процесу, МБ": max(result["rss"] for result in results) / 2 ** 20,
+        "Приріст RSS на сесію, МБ": np.mean([result["rss_growth"] for result in results]) / 2 ** 20,
+        "Пам'ять сесії, МБ": max(result["session"] for result in results) / 2 ** 20,
+        "errors": errors[:5],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Навантажувальний тест сторінок моніторингу цін")
+    parser.add_argument("--page", choices=list(PAGES), default="kyiv")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--interactions", type=int, default=10)
+    parser.add_argument("--cold", action="store_true", help="Не прогрівати кеші процесів сесій перед вимірюванням")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    # Тест завжди працює на синтетичних таблицях; процеси сесій успадковують середовище
+    os.environ["PRICE_MONITORING_FAKE_SHEETS"] = "1"
+
+    rows = []
+    for sessions in args.sessions:
+        row = run_level(args.page, sessions, args.interactions, args.seed, warm=not args.cold)
+        for error in row.pop("errors"):
+            print(f"Помилка ({sessions} сесій): {error}")
+        rows.append(row)
+        print(f"{sessions} сесій: p95 {row['p95, мс']:.0f} мс, помилок {row['Помилок']}", flush=True)
+
+    print(pd.DataFrame(rows).round(1).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""Облік пам'яті етапів обробки для кожної сесії і бюджет пам'яті.
+
+Для кожної колонки сесії (ціни або кількість міста) записується розмір
+результату кожного етапу ("утримується") і, якщо ввімкнено трасування,
+піковий приріст пам'яті під час етапу. Результати спільних етапів (таблиця,
+блок товар × дата) один раз на версію даних зберігаються в кеші процесу
+і рахуються окремо від власних даних сесії (зведена таблиця, прогноз, таблиця змін).
+
+Бюджет діє на власні дані всієї сесії (усіх її колонок). Розмір розрахунку
+змін оцінюється до його побудови разом з уже утримуваними даними сесії, і
+запит, який не вміщується в бюджет, не виконується; етап, після якого власні
+дані сесії перевищили бюджет, відхиляється.
+
+Пікові значення трасування (tracemalloc) спільні для процесу: при одночасних
+сесіях пік етапу включає виділення інших потоків, тому це верхня оцінка, і
+бюджет перевіряється лише за утримуваною пам'яттю.
+
+    PRICE_MONITORING_MEMORY_BUDGET_MB=256  бюджет на власні дані сесії
+    PRICE_MONITORING_MEMORY_TRACE=1        пікові значення через tracemalloc і звіт на сторінці
+"""
+import os
+import threading
+import tracemalloc
+import weakref
+
+import numpy as np
+import pandas as pd
+
+MEMORY_BUDGET_BYTES = int(float(os.environ.get("PRICE_MONITORING_MEMORY_BUDGET_MB", "256")) * 2 ** 20)
+TRACE = bool(os.environ.get("PRICE_MONITORING_MEMORY_TRACE"))
+
+# Скільки таблиць дата × товар одночасно існує під час розрахунку змін:
+# зведена, денна, заповнена і маска спостережених значень
+WORKING_COPIES = 4
+
+_sizes_lock = threading.Lock()
+# id об'єкта -> (слабке посилання, байти); кешовані таблиці незмінні, тому розмір рахується один раз
+_sizes = {}
+
+
+class MemoryBudgetExceeded(RuntimeError):
+    pass
+
+
+def _measure(obj):
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(getattr(obj, "nbytes", None), int):
+        # Масиви NumPy і власні структури з масивами (блок товар × дата, відрізки)
+        return obj.nbytes
+    if isinstance(obj, (tuple, list)):
+        return sum(deep_bytes(item) for item in obj)
+    if isinstance(obj, dict):
+        return sum(deep_bytes(item) for item in obj.values())
+    return 0
+
+
+def deep_bytes(obj):
+    """Пам'ять таблиць і масивів в об'єкті (включно з рядками в object-стовпцях)."""
+    try:
+        weakref.ref(obj)
+    except TypeError:
+        return _measure(obj)
+
+    key = id(obj)
+    with _sizes_lock:
+        cached = _sizes.get(key)
+    if cached is not None and cached[0]() is obj:
+        return cached[1]
+
+    size = _measure(obj)
+    with _sizes_lock:
+        _sizes[key] = (weakref.ref(obj, lambda _, key=key: _sizes.pop(key, None)), size)
+    return size
+
+
+def frame_estimate(days, columns):
+    """Оцінка пам'яті розрахунку змін для days днів (рядків денної матриці) і columns товарів."""
+    return days * columns * np.dtype(float).itemsize * WORKING_COPIES
+
+
+def check_budget(estimate, budget=MEMORY_BUDGET_BYTES, used=0):
+    """Відмова, якщо estimate разом з уже утримуваними used байтами перевищує бюджет."""
+    if estimate + used > budget:
+        held = f", дані сесії вже займають {used / 2 ** 20:.0f} МБ," if used else ""
+        raise MemoryBudgetExceeded(
+            f"Запит потребує приблизно {estimate / 2 ** 20:.0f} МБ пам'яті{held} при бюджеті "
+            f"{budget / 2 ** 20:.0f} МБ. Оберіть менше товарів або коротший період."
+        )
+
+
+def measure(func, *args, **kwargs):
+    """Викликає func і повертає результат, його розмір і піковий приріст пам'яті.
+
+    Пік рахується лише з увімкненим трасуванням. Трасування спільне для процесу,
+    тому при одночасних сесіях пік може включати виділення інших потоків.
+    """
+    if TRACE and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    if TRACE:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+
+    result = func(*args, **kwargs)
+
+    peak = tracemalloc.get_traced_memory()[1] - before if TRACE else None
+    return result, deep_bytes(result), peak
+
+
+class SessionMemory:
+    """Облік пам'яті етапів однієї колонки сесії за останній перезапуск.
+
+    state - стан сесії з обліками всіх колонок; якщо його передано, власний етап,
+    після якого дані сесії перевищують budget, відхиляється.
+    """
+
+    def __init__(self, state=None, budget=MEMORY_BUDGET_BYTES):
+        self.stages = {}
+        self.state = state
+        self.budget = budget
+
+    def track(self, stage, func, *args, shared=False, **kwargs):
+        """Викликає етап і записує розмір результату та піковий приріст пам'яті."""
+        result, retained, peak = measure(func, *args, **kwargs)
+        self.record(stage, retained, peak, shared)
+        return result
+
+    def record(self, stage, retained, peak=None, shared=False):
+        """Записує етап, виміряний деінде (наприклад, у фоновій задачі)."""
+        self.stages[stage] = {"retained": retained, "peak": peak, "shared": shared}
+        if shared or self.state is None:
+            return
+        used = session_totals(self.state)["own"]
+        if used > self.budget:
+            # Результат етапу не показується, тож і не рахується за сесією
+            del self.stages[stage]
+            raise MemoryBudgetExceeded(
+                f"{stage}: дані сесії займають {used / 2 ** 20:.0f} МБ пам'яті при бюджеті "
+                f"{self.budget / 2 ** 20:.0f} МБ. Оберіть менше товарів або коротший період."
+            )
+
+    def retained(self, shared=False):
+        return sum(item["retained"] for item in self.stages.values() if item["shared"] == shared)
+
+    def table(self):
+        to_mb = lambda value: np.nan if value is None else value / 2 ** 20
+        return pd.DataFrame([
+            {
+                "Етап": stage,
+                "Утримується, МБ": to_mb(item["retained"]),
+                "Пік, МБ": to_mb(item["peak"]),
+                "Спільний кеш": item["shared"],
+            }
+            for stage, item in self.stages.items()
+        ])
+
+
+def session_memory(state, key):
+    """Облік пам'яті колонки key у стані сесії, очищений для нового перезапуску."""
+    meter = state.get(f"{key}_memory")
+    if meter is None:
+        meter = state[f"{key}_memory"] = SessionMemory(state)
+    meter.stages = {}
+    return meter
+
+
+def session_totals(state):
+    """Власна і спільна пам'ять усіх колонок сесії, байти."""
+    meters = [value for value in state.values() if isinstance(value, SessionMemory)]
+    return {
+        "own": sum(meter.retained() for meter in meters),
+        "shared": sum(meter.retained(shared=True) for meter in meters),
+    }
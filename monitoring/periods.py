@@ -0,0 +1,101 @@
+"""Зміни за періодами (тиждень, місяць, рік до року) для всіх товарів.
+
+Середні значення за тижнями і місяцями рахуються один раз на версію даних
+векторним групуванням стовпців блоку товар × дата (np.add.reduceat по
+відсортованих датах), а матриці змін зберігаються у float32. Перемикання
+періоду на сторінці лише вибирає готову матрицю.
+"""
+import numpy as np
+import pandas as pd
+
+# Період -> (підпис, частота групування, на скільки періодів назад порівнювати)
+PERIODS = {
+    "week": ("Тиждень до тижня", "W", 1),
+    "month": ("Місяць до місяця", "MS", 1),
+    "year": ("Рік до року (місяць)", "MS", 12),
+}
+
+
+class PeriodChanges:
+    """Середні за періодами і відсоткові зміни: рядки - товари, стовпці - періоди."""
+
+    def __init__(self, products, periods, means, changes):
+        self.products = products
+        self.periods = periods
+        self.means = means
+        self.changes = changes
+
+    @property
+    def nbytes(self):
+        return self.means.nbytes + self.changes.nbytes
+
+
+def _period_starts(dates, freq):
+    if freq == "MS":
+        return dates.to_period("M").to_timestamp()
+    # Тиждень з понеділка по неділю, мітка - понеділок
+    return (dates - pd.to_timedelta(dates.dayofweek, unit="D")).normalize()
+
+
+def period_means(block, freq):
+    """Середнє спостережених значень кожного товару за кожен період."""
+    if len(block.dates) == 0:
+        return pd.DatetimeIndex([], name="Період"), np.empty((len(block.products), 0), dtype=np.float32)
+
+    starts = _period_starts(block.dates, freq)
+    # Дати в блоці відсортовані, тож кожен період - суцільний відрізок стовпців
+    boundaries = np.flatnonzero(np.r_[True, starts[1:] != starts[:-1]])
+    known = ~np.isnan(block.values)
+    sums = np.add.reduceat(np.where(known, block.values, 0), boundaries, axis=1)
+    counts = np.add.reduceat(known, boundaries, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = (sums / counts).astype(np.float32)
+
+    observed = pd.DatetimeIndex(starts[boundaries])
+    # Періоди без жодної дати в таблиці теж мають стовпець, щоб зсув на 12 місяців був точним
+    periods = pd.date_range(observed[0], observed[-1], freq="MS" if freq == "MS" else "7D", name="Період")
+    full = np.full((len(block.products), len(periods)), np.nan, dtype=np.float32)
+    full[:, periods.get_indexer(observed)] = means
+    return periods, full
+
+
+def period_changes(block, period):
+    """Зміни у відсотках відносно періоду lag кроків тому."""
+    _, freq, lag = PERIODS[period]
+    periods, means = period_means(block, freq)
+    changes = np.full_like(means, np.nan)
+    if means.shape[1] > lag:
+        previous = means[:, :-lag]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            changes[:, lag:] = np.where(previous > 0, (means[:, lag:] - previous) / previous * 100, np.nan)
+    return PeriodChanges(block.products, periods, means, changes)
+
+
+def all_period_changes(block):
+    """Матриці змін для всіх періодів (PERIODS)."""
+    return {period: period_changes(block, period) for period in PERIODS}
+
+
+def change_frame(changes, products, start_date, end_date, product_column="Товар"):
+    """Довга таблиця змін обраних товарів за періоди, що починаються в діапазоні дат."""
+    positions = {product: position for position, product in enumerate(changes.products)}
+    rows = [positions[product] for product in products if product in positions]
+    columns = (changes.periods >= pd.to_datetime(start_date)) & (changes.periods <= pd.to_datetime(end_date))
+    periods = changes.periods[columns]
+    values = changes.changes[rows][:, columns]
+    return pd.DataFrame({
+        product_column: np.repeat(changes.products[rows], len(periods)),
+        "Період": np.tile(periods, len(rows)),
+        "Зміна, %": values.ravel().round(1),
+        "Середнє": changes.means[rows][:, columns].ravel().round(2),
+    }).dropna(subset=["Зміна, %"])
+
+
+def calendar_frame(block, product, start_date, end_date):
+    """Денні значення товару з днем тижня і тижнем для календарної теплової карти."""
+    positions = block.rows([product])
+    if len(positions) == 0:
+        return pd.DataFrame(columns=["Дата", "Значення"])
+    columns = block.columns(start_date, end_date)
+    values = block.values[positions[0], columns]
+    return pd.DataFrame({"Дата": block.dates[columns], "Значення": values}).dropna()
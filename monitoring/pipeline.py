@@ -0,0 +1,255 @@
+"""Кешовані етапи обробки даних з відстеженням залежностей.
+
+Ланцюжок: версія даних -> перевірений блок товар × дата -> зріз блоку
+(зведена таблиця) -> таблиця змін. Кожен етап кешується за ключем, який містить версію
+даних і лише ті параметри, від яких етап залежить, тому зміна віджета
+перераховує тільки етапи після нього.
+
+Великі таблиці кешуються через st.cache_resource (без копіювання при кожному
+зверненні) і вважаються незмінними: код сторінок не повинен змінювати їх на місці.
+
+Етапи не показують власних спінерів: вони виконуються і в потоках пулу задач
+(monitoring.jobs) та прогріву, де немає сторінки. Сторінка показує спінер
+навколо виклику, а задачі в пулі - прогрес через report.
+"""
+import hashlib
+import logging
+import os
+
+import pandas as pd
+import pyarrow as pa
+import streamlit as st
+
+from monitoring.basket import aligned_matrices, basket_index
+from monitoring.cities import CITIES, KINDS
+from monitoring.comovement import correlation_matrix, daily_returns, top_pairs
+from monitoring.fetch import fetch
+from monitoring.fill import daily_frame, fill_gaps
+from monitoring.forecast import FORECAST_DAYS, forecast_all
+from monitoring.history import as_of, record_ingest
+from monitoring.ingest import clean_sheet, split_columns
+from monitoring.periods import all_period_changes
+from monitoring.runs import encode_block
+from monitoring.search import build_index
+from monitoring.stats import price_changes, quantity_changes, run_changes
+from monitoring.wide import WideBlock
+
+logger = logging.getLogger(__name__)
+
+# Скільки варіантів кожного етапу тримати в кеші
+MAX_ENTRIES = 32
+
+# Помилки сховища історії: недоступні або пошкоджені файли журналу і Parquet
+HISTORY_ERRORS = (OSError, pa.ArrowException, ValueError)
+
+
+def data_version(data):
+    """Стабільний відбиток вмісту таблиці, який використовується як ключ кешу."""
+    digest = hashlib.sha1()
+    digest.update("|".join(map(str, data.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(data.astype(str), index=False).to_numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+
+def _connection():
+    # Синтетичні таблиці для навантажувальних тестів і розробки без доступу до Google
+    if os.environ.get("PRICE_MONITORING_FAKE_SHEETS"):
+        from monitoring.fake_sheets import FakeSheetsConnection
+
+        return st.connection("fake_gsheets", type=FakeSheetsConnection)
+
+    # Важкі модулі імпортуються лише під час першого завантаження
+    from streamlit_gsheets import GSheetsConnection
+
+    return st.connection("gsheets", type=GSheetsConnection)
+
+
+def _read_sheet(spreadsheet):
+    conn = _connection()
+    # Кешування і бюджет запитів - у monitoring.fetch, тому кеш з'єднання вимкнено
+    data = conn.read(spreadsheet=spreadsheet, usecols=None, ttl=0)
+
+    # Прибираємо стовпець 'id', якщо він існує
+    if 'id' in data.columns:
+        data = data.drop(columns='id')
+
+    return data, data_version(data)
+
+
+def load_sheet(spreadsheet):
+    """Завантажує таблицю і повертає її разом з версією даних.
+
+    Одночасні звернення до однієї таблиці об'єднуються в один запит до API,
+    а при помилці повертається остання успішна копія.
+    """
+    return fetch(spreadsheet, lambda: _read_sheet(spreadsheet))
+
+
+def id_columns_of(data):
+    return split_columns(data.columns)[4]
+
+
+@st.cache_resource(max_entries=MAX_ENTRIES, show_spinner=False)
+def grid_options(version, _data):
+    from st_aggrid import GridOptionsBuilder
+
+    first_col = _data.columns[0]
+    gb = GridOptionsBuilder.from_dataframe(_data)
+    gb.configure_column(first_col, pinned='left', filter='agSetColumnFilter')
+    # Фільтр-список для решти ідентифікаційних стовпців (категорія тощо)
+    for column in id_columns_of(_data):
+        if column != first_col:
+            gb.configure_column(column, filter='agSetColumnFilter')
+    return gb.build()
+
+
+@st.cache_resource(max_entries=MAX_ENTRIES, show_spinner=False)
+def wide_table(version, _data, value_name, missing_as_zero=False):
+    """Перевірений блок товар × дата без дублікатів і звіт про якість даних.
+
+    Перевірка схеми, очищення значень і усунення дублікатів виконуються один
+    раз на версію даних, а не при кожній взаємодії.
+    """
+    return clean_sheet(_data, value_name, missing_as_zero)
+
+
+@st.cache_resource(max_entries=MAX_ENTRIES, show_spinner=False)
+def recorded_ingest(spreadsheet, version, value_name, product_column, _block):
+    """Запис версії даних у журнал змін, один раз на версію.
+
+    Якщо сховище історії недоступне або його файли пошкоджені (Parquet, журнал),
+    сторінка працює без історії.
+    """
+    try:
+        # Довга таблиця потрібна лише на час запису відмінностей
+        return record_ingest(spreadsheet, version, _block.to_long(), value_name, product_column)
+    except HISTORY_ERRORS as e:
+        logger.warning("Не вдалося записати історію змін для %s: %s", spreadsheet, e)
+        return None
+
+
+@st.cache_resource(max_entries=MAX_ENTRIES, show_spinner=False)
+def history_table(spreadsheet, ingest_id, value_name, product_column):
+    """Блок товар × дата на момент минулого завантаження."""
+    return WideBlock.from_long(as_of(spreadsheet, ingest_id, value_name, product_column), value_name, product_column)
+
+
+@st.cache_resource(max_entries=MAX_ENTRIES, show_spinner=False)
+def date_bounds(version, value_name, _block):
+    """Межі дат для віджета вибору діапазону (NaT, якщо значень немає)."""
+    if len(_block.dates) == 0:
+        return pd.NaT, pd.NaT
+    return _block.dates[0], _block.dates[-1]
+
+
+@st.cache_resource(max_entries=MAX_ENTRIES, show_spinner=False)
+def product_index(version, product_column, _data):
+    """Індекс пошуку і груп товарів, один на версію даних."""
+    return build_index(_data, product_column, id_columns_of(_data))
+
+
+@st.cache_resource(max_entries=MAX_ENTRIES, show_spinner=False)
+def period_table(version, value_name, product_column, _block):
+    """Зміни за тижнями, місяцями і рік до року для всіх товарів, один раз на версію даних."""
+    return all_period_changes(_block)
+
+
+@st.cache_resource(max_entries=MAX_ENTRIES, show_spinner=False)
+def pivot_table(slice_key, _block):
+    """Таблиця дата × товар для графіка і розрахунку змін - зріз блоку.
+
+    slice_key = (версія, стовпець значення, стовпець товару, товари, початок, кінець).
+    """
+    _, _, _, products, start_date, end_date = slice_key
+    return _block.frame(products, start_date, end_date)
+
+
+@st.cache_resource(max_entries=MAX_ENTRIES, show_spinner=False)
+def forecast_table(version, value_name, product_column, method, _block):
+    """Прогноз для всіх товарів, один розрахунок на версію даних і метод."""
+    return forecast_all(_block.daily(), FORECAST_DAYS, method)
+
+
+@st.cache_resource(max_entries=MAX_ENTRIES, show_spinner=False)
+def correlation_table(version, value_name, product_column, lag, _block, _report=None):
+    """Кореляції денних змін усіх товарів, одна матриця на версію даних і запізнення.
+
+    Повертає масив товарів, матрицю кореляцій у тому самому порядку і пари
+    товарів з найбільшою кореляцією (теж залежать лише від версії і запізнення).
+    """
+    wide = _block.daily()
+    corr, _ = correlation_matrix(daily_returns(wide), lag, report=_report)
+    products = wide.columns.to_numpy()
+    return products, corr, top_pairs(corr, products, symmetric=lag == 0)
+
+
+@st.cache_resource(max_entries=MAX_ENTRIES, show_spinner=False)
+def basket_matrices(price_version, quantity_version, price_product_column, quantity_product_column,
+                    _prices, _quantities):
+    """Денні матриці цін і кількостей кошика, одні на пару версій цін і кількості."""
+    return aligned_matrices(_prices.daily(), _quantities.daily())
+
+
+@st.cache_resource(max_entries=MAX_ENTRIES, show_spinner=False)
+def basket_table(price_version, quantity_version, price_product_column, quantity_product_column, start_date,
+                 _prices, _quantities):
+    """Індекси цін кошика з базою (і складом кошика) на start_date.
+
+    Кешується за парою версій і початком періоду.
+    """
+    prices, quantities = basket_matrices(
+        price_version, quantity_version, price_product_column, quantity_product_column,
+        _prices, _quantities
+    )
+    start = pd.to_datetime(start_date)
+    return basket_index(prices.loc[start:], quantities.loc[start:])
+
+
+@st.cache_resource(max_entries=MAX_ENTRIES, show_spinner=False)
+def run_table(version, value_name, product_column, _block):
+    """Ряди всіх товарів, стиснені з блоку до точок зміни значення, один раз на версію даних."""
+    return encode_block(_block)
+
+
+@st.cache_data(max_entries=MAX_ENTRIES, show_spinner=False)
+def change_table(slice_key, fill_strategy, fill_limit, _pivot, _block=None, _report=None):
+    """Таблиця змін для зрізу після заповнення пропусків.
+
+    Для заповнення останнім відомим значенням таблиця рахується зі стиснених
+    рядів (потрібен блок усієї історії _block): без денної матриці і без обмеження
+    довжини діапазону. Результат - як у денного ряду всієї історії після ffill,
+    тобто на початок періоду береться значення, що діяло того дня; денна
+    матриця зрізу (без _block) бачить лише значення всередині періоду.
+    Повертає таблицю і ознаку обрізання діапазону дат до MAX_DAYS. Якщо передано
+    _report, він отримує частку виконаного між кроками.
+    """
+    report = _report or (lambda fraction, message=None: None)
+    version, value_name, product_column, products, start_date, end_date = slice_key
+    if fill_strategy == "locf" and _block is not None:
+        report(0.0, "стиснення рядів")
+        runs = run_table(version, value_name, product_column, _block)
+        report(0.5, "підсумки за період")
+        stats = runs.range_stats(start_date, end_date, products)
+        return run_changes(stats, value_name, products, start_date, end_date, product_column), False
+
+    report(0.0, "денна матриця")
+    wide, truncated = daily_frame(_pivot, start_date, end_date, columns=list(products))
+    report(0.4, "заповнення пропусків")
+    filled, filled_fraction = fill_gaps(wide, fill_strategy, fill_limit)
+    del wide
+    report(0.8, "підсумки за період")
+
+    if value_name == "Ціна":
+        return price_changes(filled, filled_fraction, product_column), truncated
+    return quantity_changes(filled, filled_fraction, product_column), truncated
+
+
+def city_table(city_id, kind):
+    """Очищений блок товар × дата міста з кешу етапів (для експорту, SQL і зовнішніх клієнтів).
+
+    Повертає блок, стовпець товару і версію даних.
+    """
+    data, version = load_sheet(CITIES[city_id][kind])
+    value_name, missing_as_zero = KINDS[kind]
+    block, report = wide_table(version, data, value_name, missing_as_zero)
+    return block, report["product_column"], version
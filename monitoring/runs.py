@@ -0,0 +1,192 @@
+"""Стиснене зберігання рядів: лише точки зміни значення для кожного товару.
+
+Ціни зазвичай тримаються однаковими багато днів поспіль, тому замість кожної
+клітинки зберігається послідовність відрізків (початок, значення). Відрізок
+починається зі спостереження з новим значенням і діє до початку наступного
+відрізка, а останній відрізок товару - без обмеження, як у заповненні останнім
+відомим значенням. Дні без спостережень відрізок не розривають: вони
+зберігаються окремо як проміжки перенесеного значення (від дня після
+спостереження до наступного спостереження, останній - без обмеження).
+
+Статистика за діапазоном дат (початкове, кінцеве, середнє, максимум, дата
+максимуму і кількість заповнених днів) рахується прямо з відрізків, без
+розгортання в денний ряд, і збігається з денним рядом, заповненим ffill.
+"""
+import numpy as np
+import pandas as pd
+
+DAY = np.timedelta64(1, "D")
+# Кінець останнього відрізка товару: значення переноситься на будь-яку пізнішу дату
+OPEN_END = np.datetime64("9999-12-31", "D")
+
+
+class ProductRuns:
+    """Відрізки сталих значень для всіх товарів.
+
+    Відрізки товару products[i] займають позиції offsets[i]:offsets[i + 1]
+    у масивах starts і values, проміжки без спостережень - позиції
+    gap_offsets[i]:gap_offsets[i + 1] у масивах gap_starts і gap_stops
+    (gap_stops не включно).
+    """
+
+    def __init__(self, products, offsets, starts, values, gap_offsets, gap_starts, gap_stops):
+        self.products = products
+        self.offsets = offsets
+        self.starts = starts
+        self.values = values
+        self.gap_offsets = gap_offsets
+        self.gap_starts = gap_starts
+        self.gap_stops = gap_stops
+        self._positions = {product: position for position, product in enumerate(products)}
+
+        # Кінець дії відрізка (не включно): початок наступного відрізка товару
+        self.stops = np.empty_like(starts)
+        self.stops[:-1] = starts[1:]
+        self.stops[offsets[1:] - 1] = OPEN_END
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def nbytes(self):
+        arrays = (self.offsets, self.starts, self.values, self.stops, self.gap_offsets, self.gap_starts, self.gap_stops)
+        return sum(array.nbytes for array in arrays)
+
+    def _positions_of(self, products):
+        if products is None:
+            return np.arange(len(self.products))
+        return np.array([self._positions[product] for product in products if product in self._positions],
+                        dtype=np.int64)
+
+    @staticmethod
+    def _select(offsets, positions):
+        """Номери елементів товарів positions і номер товару (серед positions) для кожного."""
+        counts = np.diff(offsets)[positions]
+        codes = np.repeat(np.arange(len(positions)), counts)
+        # Номер елемента: початок товару плюс номер елемента всередині товару
+        items = offsets[positions][codes] + np.arange(len(codes)) - np.repeat(np.cumsum(counts) - counts, counts)
+        return codes, items
+
+    def range_stats(self, start_date, end_date, products=None):
+        """Статистика кожного товару за дні start_date..end_date включно.
+
+        Повертає таблицю з індексом товару і стовпцями Початкове, Кінцеве,
+        Середнє, Макс., Дата макс. (NaN, якщо в діапазоні немає значень) і
+        Заповнено днів (дні зі значенням, перенесеним з раніше спостереженого дня).
+        Початкове - значення, що діяло в день start_date (NaN, якщо товар ще не з'явився).
+        """
+        positions = self._positions_of(products)
+        codes, runs = self._select(self.offsets, positions)
+        start = np.datetime64(pd.to_datetime(start_date).date(), "D")
+        stop = np.datetime64(pd.to_datetime(end_date).date(), "D") + DAY
+
+        values = self.values[runs]
+        first_days = np.maximum(self.starts[runs], start)
+        days = (np.minimum(self.stops[runs], stop) - first_days) // DAY
+        inside = days > 0
+
+        # Дні діапазону в проміжках без спостережень
+        gap_codes, gaps = self._select(self.gap_offsets, positions)
+        gap_days = (np.minimum(self.gap_stops[gaps], stop) - np.maximum(self.gap_starts[gaps], start)) // DAY
+        gap_days = np.maximum(gap_days, 0)
+
+        n = len(positions)
+        initial = np.full(n, np.nan)
+        final = np.full(n, np.nan)
+        maximum = np.full(n, np.nan)
+        max_dates = np.full(n, np.datetime64("NaT"), dtype="datetime64[D]")
+
+        # Відрізки відсортовані за товаром і датою: перший і останній відрізок у діапазоні
+        inside_codes = codes[inside]
+        present, first = np.unique(inside_codes, return_index=True)
+        last = len(inside_codes) - 1 - np.unique(inside_codes[::-1], return_index=True)[1]
+        inside_values = values[inside]
+        # Перший відрізок діє в день start_date, лише якщо почався не пізніше
+        at_start = self.starts[runs][inside][first] <= start
+        initial[present[at_start]] = inside_values[first[at_start]]
+        # Останній відрізок діє до кінця діапазону
+        final[present] = inside_values[last]
+
+        weights = np.where(inside, days, 0)
+        known_days = np.bincount(codes, weights=weights, minlength=n)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.bincount(codes, weights=weights * values, minlength=n) / known_days
+
+        if len(present):
+            maximum[present] = np.maximum.reduceat(inside_values, first)
+            # Перший відрізок з максимальним значенням
+            at_max = inside & (values == maximum[codes])
+            max_codes, max_runs = np.unique(codes[at_max], return_index=True)
+            max_dates[max_codes] = first_days[at_max][max_runs]
+
+        return pd.DataFrame({
+            "Початкове": initial,
+            "Кінцеве": final,
+            "Середнє": mean,
+            "Макс.": maximum,
+            "Дата макс.": max_dates.astype("datetime64[ns]"),
+            "Заповнено днів": np.bincount(gap_codes, weights=gap_days, minlength=n).astype(np.int64),
+        }, index=pd.Index(self.products[positions], name="Товар"))
+
+
+def _encode(products, dates, values, names=None):
+    """Відрізки зі спостережень, відсортованих за товаром і датою.
+
+    Якщо передано names, products - номери товарів у names.
+    """
+    if len(values) == 0:
+        empty = np.array([], dtype="datetime64[D]")
+        no_offsets = np.zeros(1, dtype=np.int64)
+        return ProductRuns(np.array([], dtype=object), no_offsets, empty, values, no_offsets, empty, empty)
+
+    new_product = np.ones(len(values), dtype=bool)
+    new_product[1:] = products[1:] != products[:-1]
+    # Новий відрізок: інший товар або інше значення; пропущені дні відрізок не розривають
+    changed = new_product.copy()
+    changed[1:] |= values[1:] != values[:-1]
+    # Проміжок після спостереження: до наступного спостереження товару або без обмеження після останнього
+    last_of_product = np.append(new_product[1:], True)
+    gap_after = last_of_product.copy()
+    gap_after[:-1] |= dates[1:] - dates[:-1] != DAY
+    gap_rows = np.flatnonzero(gap_after)
+    gap_stops = np.full(len(gap_rows), OPEN_END)
+    inner = ~last_of_product[gap_rows]
+    gap_stops[inner] = dates[gap_rows[inner] + 1]
+
+    run_rows = np.flatnonzero(changed)
+    product_rows = np.flatnonzero(new_product)
+    # Номер першого відрізка (проміжку) кожного товару серед відрізків (проміжків)
+    offsets = np.append(np.searchsorted(run_rows, product_rows), len(run_rows)).astype(np.int64)
+    gap_offsets = np.append(np.searchsorted(gap_rows, product_rows), len(gap_rows)).astype(np.int64)
+
+    products = products[product_rows]
+    return ProductRuns(
+        products if names is None else names[products],
+        offsets,
+        dates[run_rows],
+        values[run_rows],
+        gap_offsets,
+        dates[gap_rows] + DAY,
+        gap_stops,
+    )
+
+
+def encode_runs(long_df, value_name, product_column="Товар"):
+    """Стискає довгу таблицю (відсортовану за товаром і датою, без пропущених значень) до відрізків."""
+    return _encode(
+        long_df[product_column].to_numpy(),
+        long_df["Дата"].to_numpy().astype("datetime64[D]"),
+        long_df[value_name].to_numpy(dtype=float),
+    )
+
+
+def encode_block(block):
+    """Стискає блок товар × дата (monitoring.wide.WideBlock) до відрізків без довгої таблиці."""
+    # Позиції клітинок зі значенням ідуть за товаром, потім за датою
+    product_positions, date_positions = np.nonzero(~np.isnan(block.values))
+    return _encode(
+        product_positions,
+        block.dates.to_numpy().astype("datetime64[D]")[date_positions],
+        block.values[product_positions, date_positions],
+        block.products,
+    )
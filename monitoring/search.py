@@ -0,0 +1,98 @@
+"""Індекс пошуку товарів і групування за ідентифікаційними стовпцями.
+
+Індекс будується один раз на версію даних: відсортований словник слів назв
+для пошуку за префіксом (bisect), нечіткий пошук по словнику слів як запасний
+варіант, і групи товарів за кожним іншим нечисловим стовпцем (категорія тощо).
+"""
+import bisect
+import difflib
+import re
+
+import pandas as pd
+
+# Скільки варіантів показувати у списку вибору
+MAX_OPTIONS = 200
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _words(text):
+    return _WORD_RE.findall(str(text).casefold())
+
+
+class ProductIndex:
+    def __init__(self, products, groups=None):
+        self.products = list(products)
+        self.groups = groups or {}
+
+        # Пари (слово, номер товару), відсортовані для пошуку за префіксом
+        pairs = sorted(
+            (word, position)
+            for position, product in enumerate(self.products)
+            for word in set(_words(product))
+        )
+        self._words = [word for word, _ in pairs]
+        self._positions = [position for _, position in pairs]
+        self._vocabulary = sorted(set(self._words))
+
+    def _prefix_positions(self, prefix):
+        start = bisect.bisect_left(self._words, prefix)
+        end = bisect.bisect_left(self._words, prefix + "\uffff")
+        return set(self._positions[start:end])
+
+    def _fuzzy_positions(self, word):
+        positions = set()
+        for match in difflib.get_close_matches(word, self._vocabulary, n=10, cutoff=0.75):
+            positions |= self._prefix_positions(match)
+        return positions
+
+    def search(self, query, limit=MAX_OPTIONS):
+        """Товари, у назві яких кожне слово запиту є префіксом якогось слова.
+
+        Якщо для слова немає збігів за префіксом, використовується нечіткий пошук.
+        """
+        query_words = _words(query)
+        if not query_words:
+            return self.products[:limit]
+
+        found = None
+        for word in query_words:
+            positions = self._prefix_positions(word) or self._fuzzy_positions(word)
+            found = positions if found is None else found & positions
+            if not found:
+                return []
+
+        return [self.products[position] for position in sorted(found)][:limit]
+
+    def group_columns(self):
+        return list(self.groups)
+
+    def group_values(self, column):
+        return list(self.groups.get(column, {}))
+
+    def group_products(self, column, values):
+        members = self.groups.get(column, {})
+        selected = []
+        for value in values:
+            selected.extend(members.get(value, []))
+        return list(dict.fromkeys(selected))
+
+
+def build_index(data, product_column, id_columns):
+    """Будує індекс з "широкої" таблиці (один рядок на товар)."""
+    products = data[product_column].dropna().drop_duplicates()
+
+    groups = {}
+    for column in id_columns:
+        if column == product_column or pd.api.types.is_numeric_dtype(data[column]):
+            continue
+        pairs = data[[column, product_column]].dropna().drop_duplicates()
+        # Стовпці, унікальні для кожного товару, не є групуванням
+        if pairs.empty or pairs[column].nunique() >= len(products):
+            continue
+        groups[column] = {
+            value: members.tolist()
+            for value, members in pairs.groupby(column, sort=True)[product_column]
+        }
+
+    return ProductIndex(products.tolist(), groups)
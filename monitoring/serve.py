@@ -0,0 +1,41 @@
+"""Запуск сервера з прогрівом кешів одразу після старту процесу.
+
+    python -m monitoring.serve [--api] [аргументи streamlit run]
+
+Прогрів виконується у фоновому потоці того самого процесу, тому кеші вже
+заповнені, коли приходить перший користувач. З --api у тому самому процесі і
+на тому самому порту під /api працює HTTP API (monitoring.asgi).
+"""
+import logging
+import os
+import sys
+import time
+
+MAIN_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "🏠Kyiv.py")
+# Сторінки разом з API (st.App), streamlit run знаходить у ньому ASGI-застосунок
+ASGI_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "asgi.py")
+
+
+def main():
+    started = time.perf_counter()
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger("monitoring").setLevel(logging.INFO)
+
+    from monitoring.warmup import start_warmup
+
+    start_warmup()
+
+    from streamlit.web import cli
+
+    logging.getLogger(__name__).info("Імпорт модулів сервера: %.2f с", time.perf_counter() - started)
+    args = sys.argv[1:]
+    script = MAIN_SCRIPT
+    if "--api" in args:
+        args.remove("--api")
+        script = ASGI_SCRIPT
+    sys.argv = ["streamlit", "run", script, *args]
+    sys.exit(cli.main())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""SQL-запити (DuckDB) до очищених даних усіх міст.
+
+Кожен запит виконується в окремому з'єднанні DuckDB у пам'яті, в якому
+кешовані блоки товар × дата (monitoring.pipeline) зареєстровані без копіювання
+в базу: значення блоку і ідентифікаційні стовпці товарів DuckDB читає напряму,
+а довгий формат будує сам (UNPIVOT) лише для стовпців, потрібних запиту.
+Доступ до файлів і мережі вимкнено, дозволено лише SELECT.
+
+Представлення:
+    <місто>_<prices|quantities>  - довга таблиця міста з усіма стовпцями
+    prices, quantities           - усі міста разом: Місто, Товар, Дата, Ціна/Кількість
+
+Збережені запити зберігаються у <PRICE_MONITORING_DATA>/queries.json.
+"""
+import json
+import os
+import threading
+
+import pandas as pd
+
+from monitoring.cities import CITIES, KINDS
+from monitoring.history import DATA_DIR
+
+QUERIES_PATH = os.path.join(DATA_DIR, "queries.json")
+MAX_ROWS = 10_000
+
+EXAMPLE_QUERIES = {
+    "Ціна зросла >20% за 30 днів, а кількість зменшилась": """\
+WITH bounds AS (
+    SELECT Місто, max(Дата) AS Кінець, max(Дата) - INTERVAL 30 DAY AS Початок
+    FROM prices
+    GROUP BY Місто
+),
+price_change AS (
+    SELECT p.Місто, p.Товар, arg_min(p.Ціна, p.Дата) AS Було, arg_max(p.Ціна, p.Дата) AS Стало
+    FROM prices p JOIN bounds b USING (Місто)
+    WHERE p.Дата BETWEEN b.Початок AND b.Кінець
+    GROUP BY ALL
+),
+stock_change AS (
+    SELECT q.Місто, q.Товар, arg_min(q.Кількість, q.Дата) AS Було, arg_max(q.Кількість, q.Дата) AS Стало
+    FROM quantities q JOIN bounds b USING (Місто)
+    WHERE q.Дата BETWEEN b.Початок AND b.Кінець
+    GROUP BY ALL
+)
+SELECT p.Місто, p.Товар,
+       round((p.Стало - p.Було) / p.Було * 100, 1) AS "Зміна ціни, %",
+       round((s.Стало - s.Було) / nullif(s.Було, 0) * 100, 1) AS "Зміна кількості, %"
+FROM price_change p JOIN stock_change s USING (Місто, Товар)
+WHERE p.Було > 0 AND p.Стало > p.Було * 1.2 AND s.Стало < s.Було
+ORDER BY "Зміна ціни, %" DESC""",
+    "Середня ціна за місяцями по містах": """\
+SELECT Місто, date_trunc('month', Дата) AS Місяць, round(avg(Ціна), 2) AS "Середня ціна", count(DISTINCT Товар) AS Товарів
+FROM prices
+GROUP BY ALL
+ORDER BY Місто, Місяць""",
+}
+
+_queries_lock = threading.Lock()
+
+
+class QueryError(ValueError):
+    pass
+
+
+def _quote(identifier):
+    return '"' + str(identifier).replace('"', '""') + '"'
+
+
+def catalog():
+    """Таблиці для запитів: (місто, вид) -> (блок товар × дата, стовпець товару, версія).
+
+    Таблиці, які не вдалося завантажити, пропускаються; їхні помилки - у другому значенні.
+    """
+    from monitoring.pipeline import city_table
+
+    tables, errors = {}, {}
+    for city_id in CITIES:
+        for kind in KINDS:
+            try:
+                tables[(city_id, kind)] = city_table(city_id, kind)
+            except Exception as e:
+                errors[(city_id, kind)] = e
+    return tables, errors
+
+
+def _register_block(con, name, block, value_name):
+    """Представлення name з довгою таблицею блоку (клітинки без значення пропускаються)."""
+    # Масив значень без копіювання: стовпець на дату, рядок на товар, як у ідентифікаційних стовпців
+    values = pd.DataFrame(block.values, columns=block.dates.strftime("%Y-%m-%d"), copy=False)
+    con.register(f"{name}_values", values)
+    con.register(f"{name}_products", block.attributes)
+    id_columns = ", ".join(_quote(column) for column in block.attributes.columns)
+    con.execute(f"""
+        CREATE TEMP VIEW {name} AS
+        SELECT {id_columns}, CAST(Дата AS TIMESTAMP) AS Дата, {_quote(value_name)}
+        FROM (
+            UNPIVOT ({name}_products POSITIONAL JOIN {name}_values)
+            ON COLUMNS(* EXCLUDE ({id_columns}))
+            INTO NAME Дата VALUE {_quote(value_name)}
+        )
+    """)
+
+
+def _connect(tables):
+    import duckdb
+
+    con = duckdb.connect(config={"enable_external_access": False})
+    for kind, (value_name, _) in KINDS.items():
+        parts = []
+        for (city_id, table_kind), (block, product_column, _) in tables.items():
+            if table_kind != kind:
+                continue
+            name = f"{city_id}_{kind}"
+            _register_block(con, name, block, value_name)
+            parts.append(
+                f"SELECT '{city_id}' AS Місто, {_quote(product_column)} AS Товар, Дата, {_quote(value_name)} FROM {name}"
+            )
+        if parts:
+            con.execute(f"CREATE TEMP VIEW {kind} AS " + " UNION ALL ".join(parts))
+    return con
+
+
+def table_columns(tables):
+    """Назви представлень і їхні стовпці для довідки на сторінці."""
+    columns = {}
+    for kind, (value_name, _) in KINDS.items():
+        if any(table_kind == kind for _, table_kind in tables):
+            columns[kind] = ["Місто", "Товар", "Дата", value_name]
+    for (city_id, kind), (block, _, _) in tables.items():
+        columns[f"{city_id}_{kind}"] = [*block.attributes.columns, "Дата", KINDS[kind][0]]
+    return columns
+
+
+def run_query(sql, tables, max_rows=MAX_ROWS):
+    """Виконує один SELECT і повертає перші max_rows рядків та ознаку обрізання."""
+    import duckdb
+
+    con = _connect(tables)
+    try:
+        try:
+            statements = con.extract_statements(sql)
+        except duckdb.Error as e:
+            raise QueryError(str(e)) from e
+        if len(statements) != 1:
+            raise QueryError("Потрібен рівно один запит")
+        if statements[0].type != duckdb.StatementType.SELECT:
+            raise QueryError("Дозволено лише запити SELECT")
+        try:
+            result = con.sql(sql).limit(max_rows + 1).fetch_arrow_table()
+        except duckdb.Error as e:
+            raise QueryError(str(e)) from e
+    finally:
+        con.close()
+
+    truncated = result.num_rows > max_rows
+    return result.slice(0, max_rows).to_pandas(), truncated
+
+
+def saved_queries():
+    """Збережені запити: назва -> SQL."""
+    if not os.path.exists(QUERIES_PATH):
+        return {}
+    with open(QUERIES_PATH, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def _write_queries(queries):
+    os.makedirs(DATA_DIR, exist_ok=True)
+    with open(QUERIES_PATH + ".tmp", "w", encoding="utf-8") as file:
+        json.dump(queries, file, ensure_ascii=False, indent=2)
+    os.replace(QUERIES_PATH + ".tmp", QUERIES_PATH)
+
+
+def save_query(name, sql):
+    with _queries_lock:
+        queries = saved_queries()
+        queries[name] = sql
+        _write_queries(queries)
+
+
+def delete_query(name):
+    with _queries_lock:
+        queries = saved_queries()
+        queries.pop(name, None)
+        _write_queries(queries)
@@ -0,0 +1,109 @@
+"""Векторний розрахунок таблиць змін по всіх обраних товарах."""
+import numpy as np
+import pandas as pd
+
+FILLED_COLUMN = "Заповнено, %"
+
+
+def _format_dates(dates, maximum):
+    return [
+        date.strftime('%d.%m.%Y') if not np.isnan(peak) and peak > 0 else None
+        for date, peak in zip(dates, maximum)
+    ]
+
+
+def _base_stats(filled):
+    values = filled.to_numpy(dtype=float)
+    if values.shape[0] == 0:
+        empty = np.full(values.shape[1], np.nan)
+        return empty, empty, empty, empty, [None] * values.shape[1]
+
+    initial = values[0]
+    final = values[-1]
+    mean = filled.mean().to_numpy(dtype=float)
+    maximum = filled.max().to_numpy(dtype=float)
+
+    # Перша дата, на яку припадає максимум (як idxmax, але без помилки для порожніх рядів)
+    max_positions = np.where(np.isnan(values), -np.inf, values).argmax(axis=0)
+    max_dates = _format_dates(filled.index[max_positions], maximum)
+    return initial, final, mean, maximum, max_dates
+
+
+def _fraction_column(filled, filled_fraction):
+    if filled_fraction is None:
+        return None
+    return (filled_fraction.reindex(filled.columns).to_numpy(dtype=float) * 100).round(1)
+
+
+def price_changes(filled, filled_fraction=None, product_column="Товар"):
+    """Таблиця змін цін для таблиці дата × товар після заповнення пропусків."""
+    result_df = _price_table(filled.columns, *_base_stats(filled), product_column)
+    if filled_fraction is not None:
+        result_df[FILLED_COLUMN] = _fraction_column(filled, filled_fraction)
+    return result_df
+
+
+def _price_table(products, initial, final, mean, maximum, max_dates, product_column):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change = (final - initial) / initial * 100
+    change[np.isnan(initial) | (initial == 0) | np.isnan(final)] = np.nan
+
+    return pd.DataFrame({
+        product_column: products,
+        "Початкова ціна": initial,
+        "Кінцева ціна": final,
+        "Зміна, %": change.round(1),
+        "Середня ціна": mean.round(1),
+        "Макс. ціна": maximum,
+        "Дата макс.": max_dates,
+    })
+
+
+def quantity_changes(filled, filled_fraction=None, product_column="Товар"):
+    """Таблиця змін кількості для таблиці дата × товар після заповнення пропусків."""
+    result_df = _quantity_table(filled.columns, *_base_stats(filled), product_column)
+    if filled_fraction is not None:
+        result_df[FILLED_COLUMN] = _fraction_column(filled, filled_fraction)
+    return result_df
+
+
+def _quantity_table(products, initial, final, mean, maximum, max_dates, product_column):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change = (final - initial) / initial * 100
+    # Нульова початкова кількість: 0 -> 0 стабільно, 0 -> >0 новий товар (100% замість нескінченності)
+    change = np.where((initial == 0) & (final == 0), 0.0, change)
+    change = np.where((initial == 0) & (final > 0), 100.0, change)
+    change[np.isnan(initial) | np.isnan(final)] = np.nan
+
+    return pd.DataFrame({
+        product_column: products,
+        "Початкова кількість": initial,
+        "Кінцева кількість": final,
+        "Зміна, %": change.round(1),
+        "Середня кількість": mean.round(1),
+        "Макс. кількість": maximum,
+        "Дата макс.": max_dates,
+    })
+
+
+def run_changes(stats, value_name, products, start_date, end_date, product_column="Товар"):
+    """Таблиця змін зі статистики відрізків (ProductRuns.range_stats) у порядку products.
+
+    Частка заповнених днів рахується від усіх днів діапазону, як у fill_gaps.
+    """
+    stats = stats.reindex(list(products))
+    maximum = stats["Макс."].to_numpy(dtype=float)
+    table = _price_table if value_name == "Ціна" else _quantity_table
+    result_df = table(
+        stats.index,
+        stats["Початкове"].to_numpy(dtype=float),
+        stats["Кінцеве"].to_numpy(dtype=float),
+        stats["Середнє"].to_numpy(dtype=float),
+        maximum,
+        _format_dates(stats["Дата макс."], maximum),
+        product_column,
+    )
+    days = (pd.to_datetime(end_date) - pd.to_datetime(start_date)).days + 1
+    filled_days = stats["Заповнено днів"].fillna(0).to_numpy(dtype=float)
+    result_df[FILLED_COLUMN] = (filled_days / max(days, 1) * 100).round(1)
+    return result_df
@@ -0,0 +1,937 @@
+"""Колонки сторінок міст (ціни і кількість) і панель SQL-запитів.
+
+Кожна колонка - окремий фрагмент Streamlit, тому взаємодія з віджетами в одній
+колонці перезапускає лише її, а не всю сторінку.
+"""
+import logging
+from concurrent.futures import wait
+from functools import partial, wraps
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from monitoring.basket import INDEX_FORMULAS, rebase
+from monitoring.comovement import MAX_HEATMAP_PRODUCTS, MAX_LAG_DAYS, cluster_order, neighbours
+from monitoring.export import EXPORT_FORMATS, UI_MAX_ROWS, export_bytes
+from monitoring.fetch import status as fetch_status
+from monitoring.fill import FILL_STRATEGIES, FILL_LABELS, DEFAULT_STRATEGY, DEFAULT_LIMIT_DAYS, MAX_DAYS
+from monitoring.forecast import FORECAST_DAYS, FORECAST_METHODS
+from monitoring.history import list_ingests, read_diff
+from monitoring.ingest import SchemaError, report_messages
+from monitoring.jobs import POLL_SECONDS, submit
+from monitoring.memory import (
+    MEMORY_BUDGET_BYTES,
+    TRACE,
+    MemoryBudgetExceeded,
+    check_budget,
+    frame_estimate,
+    session_memory,
+    session_totals,
+)
+from monitoring.periods import PERIODS, calendar_frame, change_frame
+from monitoring.pipeline import (
+    HISTORY_ERRORS,
+    basket_table,
+    date_bounds,
+    forecast_table,
+    grid_options,
+    history_table,
+    load_sheet,
+    change_table,
+    period_table,
+    correlation_table,
+    pivot_table,
+    product_index,
+    recorded_ingest,
+    wide_table,
+)
+from monitoring.sql import (
+    EXAMPLE_QUERIES,
+    MAX_ROWS,
+    QueryError,
+    catalog,
+    delete_query,
+    run_query,
+    save_query,
+    saved_queries,
+    table_columns,
+)
+from monitoring.stats import FILLED_COLUMN
+
+logger = logging.getLogger(__name__)
+
+# Жорсткі межі вибору дат для кількості
+HARD_MIN_DATE = pd.to_datetime("2022-01-01")
+HARD_MAX_DATE = pd.to_datetime("2025-12-31")
+
+
+def fill_controls(key):
+    """Віджети вибору стратегії заповнення пропусків."""
+    fill_strategy = st.selectbox(
+        "Заповнення пропусків:",
+        options=list(FILL_STRATEGIES),
+        index=list(FILL_STRATEGIES).index(DEFAULT_STRATEGY),
+        format_func=FILL_LABELS.get,
+        key=f"{key}_fill_strategy"
+    )
+    fill_limit = DEFAULT_LIMIT_DAYS
+    if fill_strategy == "limit":
+        fill_limit = st.number_input(
+            "Максимум днів для заповнення:",
+            min_value=1,
+            max_value=MAX_DAYS,
+            value=DEFAULT_LIMIT_DAYS,
+            key=f"{key}_fill_limit"
+        )
+    return fill_strategy, int(fill_limit)
+
+
+def _add_products(state_key, products):
+    selected = st.session_state.get(state_key, [])
+    st.session_state[state_key] = list(dict.fromkeys(list(selected) + list(products)))
+
+
+def product_picker(index, label, key):
+    """Вибір товарів з пошуком за назвою і додаванням цілих груп (категорій)."""
+    state_key = f"{key}_products"
+    if state_key not in st.session_state:
+        st.session_state[state_key] = index.products[:2]
+
+    group_columns = index.group_columns()
+    if group_columns:
+        with st.expander("Вибір за групою"):
+            group_column = st.selectbox("Групувати за:", group_columns, key=f"{key}_group_column")
+            group_values = st.multiselect(
+                "Групи:",
+                options=index.group_values(group_column),
+                key=f"{key}_group_values"
+            )
+            st.button(
+                "Додати всі товари вибраних груп",
+                key=f"{key}_group_add",
+                on_click=_add_products,
+                args=(state_key, index.group_products(group_column, group_values)),
+                disabled=not group_values
+            )
+
+    query = st.text_input("Пошук товару:", key=f"{key}_search", placeholder="Почніть вводити назву...")
+
+    # У списку лише результати пошуку, а вже вибрані товари завжди залишаються доступними
+    selected = st.session_state[state_key]
+    selected_set = set(selected)
+    options = list(selected) + [product for product in index.search(query) if product not in selected_set]
+
+    return st.multiselect(label, options=options, key=state_key)
+
+
+# Скільки чекати на задачу в пулі, перш ніж показати прогрес замість результату
+QUICK_SECONDS = 0.2
+
+
+def _fragment_rerun():
+    """Чи виконується зараз перезапуск лише фрагментів, а не всієї сторінки."""
+    ctx = get_script_run_ctx()
+    return ctx is not None and bool(ctx.fragment_ids_this_run)
+
+
+def _rerun_column():
+    """Перезапуск колонки після дії користувача; у повному запуску - разом зі сторінкою."""
+    st.rerun(scope="fragment" if _fragment_rerun() else "app")
+
+
+@st.fragment(run_every=POLL_SECONDS)
+def _job_progress(key, name, label):
+    """Прогрес фонової задачі, який оновлює лише цей фрагмент з таймером.
+
+    Колонка, що запустила задачу, не перезапускається, доки задача виконується:
+    замість результату показується цей фрагмент. Коли задачу завершено або
+    скасовано, сторінка перезапускається один раз і колонка бере результат
+    (фрагмент колонки можна перезапустити лише з його власного перезапуску).
+    """
+    job = st.session_state.get(f"{key}_jobs", {}).get(name)
+    if job is None or job.done() or job.cancelled:
+        st.rerun()
+    st.progress(job.progress, text=f"{label}... {job.message}".rstrip(". "))
+
+
+def background(key, name, input_key, func, label, meter=None, stage=None):
+    """Результат фонової задачі func(report); поки вона виконується - прогрес і None.
+
+    Задача з іншим input_key замінює застарілу. Швидкі задачі (зокрема результати
+    з кешу) повертаються одразу. Якщо передано meter, пам'ять, виміряна в самій
+    задачі, записується як етап stage.
+    """
+    jobs = st.session_state.setdefault(f"{key}_jobs", {})
+    job = submit(jobs, name, input_key, func)
+    wait([job.future], timeout=QUICK_SECONDS)
+
+    if job.cancelled:
+        st.info(f"{label}: скасовано.")
+        if st.button("Запустити знову", key=f"{key}_{name}_restart"):
+            jobs.pop(name, None)
+            _rerun_column()
+        return None
+
+    if job.done():
+        if job.future.exception() is not None:
+            # Наступна взаємодія спробує ще раз
+            jobs.pop(name, None)
+        result = job.result()
+        if meter is not None:
+            meter.record(stage, job.retained, job.peak)
+        return result
+
+    _job_progress(key, name, label)
+    if st.button("Скасувати", key=f"{key}_{name}_cancel"):
+        job.cancel()
+        _rerun_column()
+    return None
+
+
+def export_controls(block, slice_key, pivot, result_df, key):
+    """Кнопки завантаження очищених даних і таблиці змін.
+
+    Файл для кнопки цілком тримається в пам'яті сервера, тому більші за
+    UI_MAX_ROWS рядків експорти пропонується робити з командного рядка.
+    """
+    _, _, product_column, products, start_date, end_date = slice_key
+    period = f"{start_date.strftime('%Y%m%d')}_{end_date.strftime('%Y%m%d')}"
+
+    with st.expander("Експорт даних"):
+        export_format = st.selectbox("Формат:", list(EXPORT_FORMATS), key=f"{key}_export_format")
+        full_history = st.checkbox("Уся історія по всіх товарах", key=f"{key}_export_full")
+        mime, extension = EXPORT_FORMATS[export_format]
+
+        # Рядків у файлі: усі клітинки блоку зі значенням або заповнені клітинки зрізу
+        rows = block.cells if full_history else int(pivot.count().sum())
+        if rows > UI_MAX_ROWS:
+            city_id, kind = key.rsplit("_", 1)
+            st.info(
+                f"Файл містив би {rows:,} рядків, зі сторінки можна завантажити до {UI_MAX_ROWS:,}. "
+                "Великі експорти записуються у файл частинами з командного рядка:"
+            )
+            st.code(f"python -m monitoring.export {city_id} {kind} {export_format} {key}.{extension}", language="bash")
+            data = None
+        elif full_history:
+            # Уся історія формується у фоні, з прогресом по частинах
+            data = background(
+                key, "export", (slice_key[0], export_format),
+                partial(export_bytes, block, export_format),
+                label="Підготовка файлу"
+            )
+            file_name = f"{key}_all.{extension}"
+        else:
+            # Файл формується лише після натискання кнопки
+            data = partial(export_bytes, block, export_format, list(products), start_date, end_date)
+            file_name = f"{key}_{period}.{extension}"
+
+        if data is not None:
+            st.download_button("Завантажити дані", data=data, file_name=file_name, mime=mime, key=f"{key}_export_data")
+        st.download_button(
+            "Завантажити таблицю змін (CSV)",
+            data=result_df.to_csv(index=False).encode("utf-8"),
+            file_name=f"{key}_changes_{period}.csv",
+            mime="text/csv",
+            key=f"{key}_export_changes"
+        )
+
+
+def forecast_controls(key):
+    """Перемикач прогнозу і вибір методу. Повертає метод або None."""
+    if not st.checkbox(f"Показати прогноз на {FORECAST_DAYS} днів", key=f"{key}_forecast"):
+        return None
+    return st.selectbox(
+        "Метод прогнозу:",
+        options=list(FORECAST_METHODS),
+        format_func=FORECAST_METHODS.get,
+        key=f"{key}_forecast_method"
+    )
+
+
+def dynamics_chart(pivot_chart, value_name, forecast=None):
+    """Графік динаміки; з прогнозом - історія, пунктир прогнозу і смуга інтервалу."""
+    if forecast is None or forecast.empty:
+        st.line_chart(pivot_chart)
+        return
+
+    import altair as alt
+
+    product_column = pivot_chart.columns.name
+    history = (
+        pivot_chart.reset_index()
+        .melt(id_vars="Дата", var_name=product_column, value_name=value_name)
+        .dropna(subset=[value_name])
+    )
+    x = alt.X("Дата:T", title=None)
+    color = alt.Color(f"{product_column}:N", title=product_column)
+
+    lines = alt.Chart(history).mark_line().encode(x=x, y=alt.Y(f"{value_name}:Q", title=None), color=color)
+    band = alt.Chart(forecast).mark_area(opacity=0.2).encode(x=x, y="Нижня межа:Q", y2="Верхня межа:Q", color=color)
+    predicted = alt.Chart(forecast).mark_line(strokeDash=[4, 4]).encode(x=x, y="Прогноз:Q", color=color)
+    st.altair_chart(band + lines + predicted, use_container_width=True)
+
+
+def chart_forecast(version, value_name, product_column, method, block, selected_products, end_date):
+    """Прогноз для обраних товарів, якщо графік доходить до останньої дати даних."""
+    if method is None:
+        return None
+    if pd.to_datetime(end_date) < block.dates[-1]:
+        st.caption("Прогноз показується, коли кінцева дата збігається з останньою датою в даних.")
+        return None
+    with st.spinner("Розрахунок прогнозу..."):
+        forecast = forecast_table(version, value_name, product_column, method, block)
+    return forecast[forecast[product_column].isin(selected_products)]
+
+
+def basket_controls(version, block, product_column, weights_url, pivot_chart, start_date, end_date, key):
+    """Індекс цін кошика з вагами з таблиці кількості поруч з обраними товарами.
+
+    Базовий день індексу і склад кошика - початок обраного періоду, ціни товарів
+    перебазовані до 100 на той самий день.
+    """
+    if weights_url is None or not st.checkbox("Показати індекс цін кошика", key=f"{key}_basket"):
+        return
+
+    try:
+        weights, weights_version = load_data(weights_url)
+        weights_block, weights_report = wide_table(weights_version, weights, "Кількість", True)
+        with st.spinner("Розрахунок індексу цін кошика..."):
+            index = basket_table(
+                version, weights_version, product_column, weights_report["product_column"], start_date,
+                block, weights_block
+            )
+    except Exception as e:
+        st.error(f"Помилка при розрахунку індексу цін кошика: {e}")
+        return
+
+    window = index.loc[:pd.to_datetime(end_date)]
+    if window.empty or window[list(INDEX_FORMULAS.values())].isna().all().all():
+        st.warning("Немає товарів з цінами і кількістю для розрахунку індексу.")
+        return
+
+    products = rebase(pivot_chart.reindex(window.index).ffill(), start_date, end_date)
+    st.subheader("Індекс цін кошика (100 = початок періоду)")
+    st.line_chart(pd.concat([window[list(INDEX_FORMULAS.values())], products], axis=1))
+
+    columns = st.columns(len(INDEX_FORMULAS))
+    for column, name in zip(columns, INDEX_FORMULAS.values()):
+        column.metric(name, f"{window[name].iloc[-1]:.1f}", f"{window[name].iloc[-1] - 100:+.1f}%")
+    st.caption(f"Товарів у кошику: {int(window['Товарів у кошику'].iloc[0])}. "
+               "Ціни без даних переносяться з останнього відомого дня.")
+
+
+def comovement_controls(version, block, value_name, product_column, selected_products, key):
+    """Теплова карта кореляцій денних змін обраних товарів і найбільш пов'язаних з ними."""
+    if not st.checkbox("Показати спільну динаміку товарів", key=f"{key}_comovement"):
+        return
+
+    lag = st.slider(
+        "Запізнення, днів (зміни другого товару після першого):",
+        min_value=0, max_value=MAX_LAG_DAYS, value=0,
+        key=f"{key}_comovement_lag"
+    )
+    try:
+        correlations = background(
+            key, "comovement", (version, value_name, product_column, lag),
+            lambda report: correlation_table(version, value_name, product_column, lag, block, _report=report),
+            label="Розрахунок кореляцій"
+        )
+    except Exception as e:
+        st.error(f"Помилка при розрахунку кореляцій: {e}")
+        return
+    if correlations is None:
+        return
+    products, corr, pairs = correlations
+
+    positions = {product: position for position, product in enumerate(products)}
+    shown = neighbours(corr, [positions[product] for product in selected_products if product in positions])
+    if len(shown) < 2:
+        st.warning("Недостатньо даних для розрахунку кореляцій обраних товарів.")
+        return
+
+    import altair as alt
+
+    block = corr[np.ix_(shown, shown)]
+    order = [products[shown[position]] for position in cluster_order(block)]
+    cells = pd.DataFrame({
+        "Товар 1": np.repeat(products[shown], len(shown)),
+        "Товар 2": np.tile(products[shown], len(shown)),
+        "Кореляція": block.ravel(),
+    })
+    heatmap = alt.Chart(cells).mark_rect().encode(
+        x=alt.X("Товар 2:N", sort=order, title=None),
+        y=alt.Y("Товар 1:N", sort=order, title=None),
+        color=alt.Color("Кореляція:Q", scale=alt.Scale(scheme="redblue", domain=[-1, 1], reverse=True)),
+        tooltip=["Товар 1", "Товар 2", alt.Tooltip("Кореляція:Q", format=".2f")],
+    )
+    st.subheader("Кореляція денних змін")
+    st.caption(
+        f"Обрані товари і найбільш пов'язані з ними (до {MAX_HEATMAP_PRODUCTS}), "
+        "впорядковані за ієрархічною кластеризацією."
+    )
+    st.altair_chart(heatmap, use_container_width=True)
+
+    st.caption(f"Пари з найбільшою кореляцією серед усіх {len(products)} товарів:")
+    st.dataframe(pairs, use_container_width=True, hide_index=True)
+
+
+def period_controls(version, block, value_name, product_column, selected_products, start_date, end_date, key):
+    """Теплові карти змін за періодами і календар денних значень обраного товару."""
+    if not st.checkbox("Показати зміни за періодами", key=f"{key}_periods"):
+        return
+
+    import altair as alt
+
+    period = st.radio(
+        "Порівняння:",
+        options=list(PERIODS),
+        format_func=lambda option: PERIODS[option][0],
+        horizontal=True,
+        key=f"{key}_period"
+    )
+    with st.spinner("Розрахунок змін за періодами..."):
+        changes = period_table(version, value_name, product_column, block)[period]
+    frame = change_frame(changes, selected_products, start_date, end_date, product_column)
+
+    # Зростання ціни - червоне, зростання кількості - зелене, як у таблиці змін
+    scheme = alt.Scale(scheme="redyellowgreen", domainMid=0, reverse=value_name == "Ціна")
+    if frame.empty:
+        st.info("Недостатньо даних для порівняння періодів у вибраному діапазоні.")
+    else:
+        frame["Період"] = frame["Період"].dt.strftime("%d.%m.%Y" if period == "week" else "%m.%Y")
+        heatmap = alt.Chart(frame).mark_rect().encode(
+            x=alt.X("Період:O", sort=None, title=None),
+            y=alt.Y(f"{product_column}:N", title=None),
+            color=alt.Color("Зміна, %:Q", scale=scheme),
+            tooltip=[product_column, "Період", "Зміна, %", "Середнє"],
+        )
+        st.subheader(f"Зміни за періодами: {PERIODS[period][0].lower()}")
+        st.altair_chart(heatmap, use_container_width=True)
+
+    product = st.selectbox("Товар для календаря:", options=selected_products, key=f"{key}_calendar_product")
+    calendar = calendar_frame(block, product, start_date, end_date)
+    if calendar.empty:
+        return
+    heatmap = alt.Chart(calendar).mark_rect().encode(
+        x=alt.X("yearweek(Дата):O", title=None, axis=alt.Axis(format="%d.%m.%Y", labelAngle=-90)),
+        y=alt.Y("day(Дата):O", title=None),
+        color=alt.Color("Значення:Q", title=value_name, scale=alt.Scale(scheme="blues")),
+        tooltip=[alt.Tooltip("Дата:T", format="%d.%m.%Y"), alt.Tooltip("Значення:Q", title=value_name)],
+    )
+    st.subheader(f"Календар: {product}")
+    st.altair_chart(heatmap, use_container_width=True)
+
+
+def history_controls(url, version, block, value_name, product_column, key):
+    """Вибір стану даних на одне з минулих завантажень таблиці.
+
+    Повертає версію і блок товар × дата обраного стану (за замовчуванням - поточного).
+    """
+    if recorded_ingest(url, version, value_name, product_column, block) is None:
+        st.caption("Історія змін таблиці недоступна.")
+        return version, block
+
+    try:
+        ingests = {ingest["id"]: ingest for ingest in list_ingests(url)}
+    except HISTORY_ERRORS as e:
+        logger.warning("Не вдалося прочитати журнал змін для %s: %s", url, e)
+        st.caption("Історія змін таблиці недоступна.")
+        return version, block
+    if len(ingests) < 2:
+        return version, block
+
+    latest_id = max(ingests)
+
+    def ingest_label(ingest_id):
+        ingest = ingests[ingest_id]
+        label = f"№{ingest_id} від {ingest['time'].replace('T', ' ')} (змінено клітинок: {ingest['changed']})"
+        return f"{label} - поточний стан" if ingest_id == latest_id else label
+
+    with st.expander("Історія змін таблиці"):
+        ingest_id = st.selectbox(
+            "Стан даних на завантаження:",
+            options=sorted(ingests, reverse=True),
+            format_func=ingest_label,
+            key=f"{key}_history"
+        )
+        try:
+            diff = read_diff(url, ingest_id).rename(columns={"Товар": product_column})
+            with st.spinner("Відновлення стану таблиці..."):
+                history = None if ingest_id == latest_id else history_table(url, ingest_id, value_name, product_column)
+        except HISTORY_ERRORS as e:
+            logger.warning("Не вдалося відновити стан %s для %s: %s", ingest_id, url, e)
+            st.caption("Стан на це завантаження недоступний, показано поточні дані.")
+            return version, block
+        st.caption("Змінені клітинки в цьому завантаженні:")
+        st.dataframe(diff, use_container_width=True, hide_index=True)
+
+    if history is None:
+        return version, block
+    return ingests[ingest_id]["version"], history
+
+
+def show_quality_report(report):
+    """Звіт про якість даних, сформований один раз під час завантаження."""
+    messages = report_messages(report)
+    if not messages:
+        return
+    with st.expander(f"⚠️ Якість даних: знайдено проблем - {len(messages)}"):
+        for message in messages:
+            st.write(f"- {message}")
+
+
+def load_data(url):
+    """Дані таблиці з попередженням, якщо показано застарілу копію."""
+    with st.spinner("Завантаження даних з Google Sheets..."):
+        data, version = load_sheet(url)
+
+    state = fetch_status(url)
+    if state is not None and state["error"] is not None:
+        st.warning(
+            f"Не вдалося оновити дані з Google Sheets ({state['error']}). "
+            f"Показано дані, завантажені {int(state['age'] // 60)} хв тому."
+        )
+    return data, version
+
+
+def memory_report(meter):
+    """Звіт про пам'ять етапів колонки (лише з увімкненим трасуванням)."""
+    if not TRACE:
+        return
+    with st.expander("Пам'ять сесії"):
+        st.dataframe(meter.table(), use_container_width=True, hide_index=True)
+        st.caption(
+            f"Власні дані колонки: {meter.retained() / 2 ** 20:.1f} МБ, "
+            f"спільний кеш: {meter.retained(shared=True) / 2 ** 20:.1f} МБ."
+        )
+        totals = session_totals(st.session_state)
+        st.caption(f"Уся сесія (всі колонки): власні дані {totals['own'] / 2 ** 20:.1f} МБ "
+                   f"при бюджеті {MEMORY_BUDGET_BYTES / 2 ** 20:.0f} МБ, "
+                   f"спільний кеш {totals['shared'] / 2 ** 20:.1f} МБ. "
+                   "Пік - для всього процесу, включно з іншими сесіями.")
+
+
+def within_budget(start_date, end_date, products):
+    """Чи вміститься розрахунок для обраного періоду і товарів у бюджет пам'яті сесії.
+
+    Облік цієї колонки вже очищено для перезапуску, тож used - дані інших колонок.
+    """
+    try:
+        check_budget(
+            frame_estimate(min((end_date - start_date).days + 1, MAX_DAYS), len(products)),
+            used=session_totals(st.session_state)["own"]
+        )
+    except MemoryBudgetExceeded as e:
+        st.warning(str(e))
+        return False
+    return True
+
+
+def budget_guard(render):
+    """Попередження замість решти колонки, якщо етап перевищив бюджет пам'яті сесії."""
+    @wraps(render)
+    def guarded(*args, **kwargs):
+        try:
+            return render(*args, **kwargs)
+        except MemoryBudgetExceeded as e:
+            st.warning(str(e))
+    return guarded
+
+
+def show_sheet(data, version, key):
+    from st_aggrid import AgGrid
+
+    # AgGrid додає стовпці в переданий DataFrame, а таблиця спільна для всіх сесій
+    AgGrid(data.copy(deep=False), gridOptions=grid_options(version, data), key=f"{key}_grid")
+
+
+@st.fragment
+@budget_guard
+def render_prices(title, url, key, weights_url=None):
+    st.title(title)
+    meter = session_memory(st.session_state, key)
+
+    try:
+        data, version = meter.track("Таблиця", load_data, url, shared=True)
+    except Exception as e:
+        st.error(f"Помилка підключення до Google Sheets: {e}")
+        return
+
+    show_sheet(data, version, key)
+
+    # Перевіряємо схему і очищаємо ціни у блок товар × дата
+    try:
+        block, report = meter.track("Блок товар × дата", wide_table, version, data, "Ціна", shared=True)
+    except SchemaError as e:
+        st.error(str(e))
+        return
+    except Exception as e:
+        st.error(f"Помилка при перетворенні даних: {e}")
+        return
+
+    show_quality_report(report)
+    product_column = report["product_column"]
+    version, block = history_controls(url, version, block, "Ціна", product_column, key)
+    min_date, max_date = date_bounds(version, "Ціна", block)
+
+    # Перевірка наявності дат
+    if pd.isna(min_date) or pd.isna(max_date):
+        st.error("Помилка у датах. Перевірте формат дат у таблиці.")
+        return
+
+    date_range = st.date_input(
+        label="Виберіть початкову і кінцеву дати:",
+        value=[min_date, max_date],
+        min_value=min_date,
+        max_value=max_date,
+        format="DD.MM.YYYY",
+        key=f"{key}_dates"
+    )
+
+    # Перевірка, що вибрано дві дати
+    if len(date_range) < 2:
+        st.warning("Будь ласка, виберіть початкову та кінцеву дати (два значення).")
+        return
+    start_date, end_date = date_range
+
+    # Захист від занадто великих діапазонів дат
+    days_diff = (end_date - start_date).days
+    if days_diff > 730:
+        st.warning(f"Вибраний діапазон ({days_diff} днів) занадто великий. Рекомендується вибрати менший період (до 730 днів).")
+
+    selected_products = product_picker(
+        product_index(version, product_column, data),
+        f"Оберіть позиції ({product_column}) для аналізу:",
+        key
+    )
+
+    # Перевірка наявності обраних товарів
+    if not selected_products:
+        st.warning("Будь ласка, оберіть хоча б один товар для аналізу.")
+        return
+
+    fill_strategy, fill_limit = fill_controls(key)
+    forecast_method = forecast_controls(key)
+
+    if not within_budget(start_date, end_date, selected_products):
+        return
+
+    # Зріз блоку товар × дата для графіка
+    slice_key = (version, "Ціна", product_column, tuple(selected_products), start_date, end_date)
+    pivot_chart = meter.track("Зведена таблиця", pivot_table, slice_key, block)
+
+    if pivot_chart.empty:
+        st.warning("Немає даних у вибраному діапазоні дат або для вибраних товарів.")
+        return
+
+    try:
+        forecast = meter.track(
+            "Прогноз", chart_forecast,
+            version, "Ціна", product_column, forecast_method, block, selected_products, end_date
+        )
+        st.subheader("Графік динаміки цін")
+        dynamics_chart(pivot_chart, "Ціна", forecast)
+    except Exception as e:
+        st.error(f"Помилка при створенні графіка: {e}")
+        st.write("Спробуйте вибрати інші товари або перевірте дані.")
+        return
+
+    basket_controls(version, block, product_column, weights_url, pivot_chart, start_date, end_date, key)
+    comovement_controls(version, block, "Ціна", product_column, selected_products, key)
+    period_controls(version, block, "Ціна", product_column, selected_products, start_date, end_date, key)
+
+    # Розрахунок початкової/кінцевої ціни одним проходом по всіх товарах
+    try:
+        changes = background(
+            key, "changes", (slice_key, fill_strategy, fill_limit),
+            lambda report: change_table(slice_key, fill_strategy, fill_limit, pivot_chart, block, _report=report),
+            label="Розрахунок таблиці змін", meter=meter, stage="Таблиця змін"
+        )
+    except Exception as e:
+        st.error(f"Помилка при розрахунку змін цін: {e}")
+        return
+    if changes is None:
+        return
+    result_df, truncated = changes
+
+    if truncated:
+        st.warning(f"Діапазон дат обмежено до {MAX_DAYS} днів для запобігання зависанню.")
+
+    # Кольорове виділення
+    def highlight_change(val): # type: ignore
+        if pd.isna(val):
+            return "color: black;"
+        elif val > 0:
+            return "color: red;"
+        elif val < 0:
+            return "color: green;"
+        else:
+            return "color: black;"
+
+    styled_result_df = (
+        result_df
+        .style
+        .applymap(highlight_change, subset=["Зміна, %"]) # type: ignore
+        .format("{:.2f}", subset=["Початкова ціна", "Кінцева ціна", "Зміна, %", "Середня ціна", "Макс. ціна"], na_rep="-")
+        .format("{:.1f}%", subset=[FILLED_COLUMN], na_rep="-")
+    )
+
+    st.subheader(f"Таблиця змін з {start_date.strftime('%d.%m.%Y')} по {end_date.strftime('%d.%m.%Y')}")
+    st.dataframe(styled_result_df, use_container_width=True)
+
+    export_controls(block, slice_key, pivot_chart, result_df, key)
+    memory_report(meter)
+
+
+@st.fragment
+@budget_guard
+def render_quantities(title, url, key):
+    st.title(title)
+
+    meter = session_memory(st.session_state, key)
+
+    # Connect to Google Sheets
+    try:
+        data, version = meter.track("Таблиця", load_data, url, shared=True)
+    except Exception as e:
+        st.error(f"Помилка підключення до Google Sheets: {e}")
+        return
+
+    # Display the full table with AgGrid
+    show_sheet(data, version, key)
+
+    # Validate schema and clean the sheet into a product x date block, missing quantities become 0
+    try:
+        block, report = meter.track(
+            "Блок товар × дата", wide_table, version, data, "Кількість", missing_as_zero=True, shared=True
+        )
+    except SchemaError as e:
+        st.warning(str(e))
+        return
+    except Exception as e:
+        st.error(f"Помилка при перетворенні даних: {e}")
+        return
+
+    show_quality_report(report)
+
+    # Check real min and max dates in the data
+    if len(block.dates) == 0:
+        st.warning("Немає коректних дат у таблиці.")
+        return
+
+    product_column = report["product_column"]
+    version, block = history_controls(url, version, block, "Кількість", product_column, key)
+    real_min_date, real_max_date = date_bounds(version, "Кількість", block)
+
+    # Limit real dates by hard limits
+    min_date = max(real_min_date, HARD_MIN_DATE)
+    max_date = min(real_max_date, HARD_MAX_DATE)
+
+    # Date selection widget
+    date_range = st.date_input(
+        label="Виберіть початкову і кінцеву дати:",
+        value=[min_date, max_date],
+        min_value=HARD_MIN_DATE,
+        max_value=HARD_MAX_DATE,
+        format="DD.MM.YYYY",
+        key=f"{key}_dates"
+    )
+
+    # Check that two dates are selected
+    if len(date_range) < 2:
+        st.warning("Будь ласка, виберіть початкову та кінцеву дати (два значення).")
+        return
+    start_date, end_date = date_range
+
+    # Check that end_date is not earlier than start_date
+    if end_date < start_date:
+        st.warning("Кінцева дата не може бути раніше початкової.")
+        return
+
+    # Захист від занадто великих діапазонів дат
+    days_diff = (end_date - start_date).days
+    if days_diff > 730:
+        st.warning(f"Вибраний діапазон ({days_diff} днів) занадто великий. Рекомендується вибрати менший період (до 730 днів).")
+
+    # Product selection
+    selected_products = product_picker(
+        product_index(version, product_column, data),
+        f"Оберіть позиції ({product_column}) для аналізу:",
+        key
+    )
+
+    if not selected_products:
+        st.warning(f"Будь ласка, оберіть принаймні одну позицію для аналізу.")
+        return
+
+    fill_strategy, fill_limit = fill_controls(key)
+    forecast_method = forecast_controls(key)
+
+    if not within_budget(start_date, end_date, selected_products):
+        return
+
+    # Slice of the product x date block for the chart
+    slice_key = (version, "Кількість", product_column, tuple(selected_products), start_date, end_date)
+    pivot_chart = meter.track("Зведена таблиця", pivot_table, slice_key, block)
+
+    if pivot_chart.empty:
+        st.warning("Немає даних у вибраному діапазоні дат або для вибраних позицій.")
+        return
+
+    try:
+        forecast = meter.track(
+            "Прогноз", chart_forecast,
+            version, "Кількість", product_column, forecast_method, block, selected_products, end_date
+        )
+
+        st.subheader("Графік динаміки кількості")
+        dynamics_chart(pivot_chart, "Кількість", forecast)
+    except Exception as e:
+        st.error(f"Помилка при створенні графіка: {e}")
+        st.write("Спробуйте вибрати інші товари або перевірте дані.")
+        return
+
+    period_controls(version, block, "Кількість", product_column, selected_products, start_date, end_date, key)
+
+    # Calculate initial/final quantities and changes in one pass over all products
+    try:
+        changes = background(
+            key, "changes", (slice_key, fill_strategy, fill_limit),
+            lambda report: change_table(slice_key, fill_strategy, fill_limit, pivot_chart, block, _report=report),
+            label="Розрахунок таблиці змін", meter=meter, stage="Таблиця змін"
+        )
+    except Exception as e:
+        st.error(f"Помилка при розрахунку змін кількості: {e}")
+        return
+    if changes is None:
+        return
+    result_df, truncated = changes
+
+    if truncated:
+        st.warning(f"Діапазон дат обмежено до {MAX_DAYS} днів для запобігання зависанню.")
+
+    # Color highlighting for changes
+    def highlight_change(val, attr):
+        if attr != "Зміна, %":
+            return ""
+
+        if pd.isna(val):
+            return "color: black;"
+        elif val > 20:
+            return "color: green; font-weight: bold"
+        elif val > 0:
+            return "color: green"
+        elif val < -20:
+            return "color: red; font-weight: bold"
+        elif val < 0:
+            return "color: red"
+        else:
+            return "color: gray"
+
+    # Apply styling
+    styled_df = result_df.style
+
+    # Apply highlighting for "Зміна, %" column
+    if "Зміна, %" in result_df.columns:
+        styled_df = styled_df.applymap( # type: ignore
+            lambda val, attr=None: highlight_change(val, attr),
+            subset=["Зміна, %"]
+        )
+
+    # Format numbers
+    styled_df = styled_df.format({
+        "Початкова кількість": "{:.2f}",
+        "Кінцева кількість": "{:.2f}",
+        "Зміна, %": "{:.1f}%",
+        "Середня кількість": "{:.2f}",
+        "Макс. кількість": "{:.2f}",
+        FILLED_COLUMN: "{:.1f}%"
+    }, na_rep="-")
+
+    st.subheader(f"Таблиця змін з {start_date.strftime('%d.%m.%Y')} по {end_date.strftime('%d.%m.%Y')}")
+    st.dataframe(styled_df, use_container_width=True)
+
+    export_controls(block, slice_key, pivot_chart, result_df, key)
+    memory_report(meter)
+
+
+def _load_query(key):
+    """Підставляє текст обраного збереженого запиту в поле запиту."""
+    name = st.session_state[f"{key}_saved"]
+    queries = {**EXAMPLE_QUERIES, **saved_queries()}
+    if name in queries:
+        st.session_state[f"{key}_text"] = queries[name]
+
+
+@st.fragment
+def render_sql(title, key):
+    st.title(title)
+
+    tables, errors = catalog()
+    for (city_id, kind), error in errors.items():
+        st.warning(f"Таблиця {city_id}_{kind} недоступна: {error}")
+    if not tables:
+        return
+
+    with st.expander("Таблиці"):
+        for name, columns in table_columns(tables).items():
+            st.markdown(f"**{name}**: " + ", ".join(columns))
+
+    user_queries = saved_queries()
+    st.selectbox(
+        "Збережений запит:",
+        options=[None, *EXAMPLE_QUERIES, *user_queries],
+        format_func=lambda name: "—" if name is None else name,
+        key=f"{key}_saved",
+        on_change=_load_query,
+        args=(key,)
+    )
+    st.session_state.setdefault(f"{key}_text", next(iter(EXAMPLE_QUERIES.values())))
+    sql = st.text_area("SQL:", height=240, key=f"{key}_text")
+
+    if st.button("Виконати", key=f"{key}_run"):
+        st.session_state[f"{key}_submitted"] = sql
+
+    with st.expander("Зберегти запит"):
+        name = st.text_input("Назва:", key=f"{key}_name")
+        if st.button("Зберегти", key=f"{key}_save") and name.strip():
+            save_query(name.strip(), sql)
+            st.success(f"Запит «{name.strip()}» збережено.")
+        selected = st.session_state.get(f"{key}_saved")
+        if selected in user_queries and st.button(f"Видалити «{selected}»", key=f"{key}_delete"):
+            delete_query(selected)
+            st.session_state.pop(f"{key}_saved", None)
+            _rerun_column()
+
+    submitted = st.session_state.get(f"{key}_submitted")
+    if not submitted:
+        return
+
+    # Запит залежить від тексту і версій усіх таблиць
+    versions = tuple(sorted((table, version) for table, (_, _, version) in tables.items()))
+    try:
+        result = background(
+            key, "query", (submitted, versions),
+            lambda report: run_query(submitted, tables),
+            label="Виконання запиту"
+        )
+    except QueryError as e:
+        st.error(f"Помилка запиту: {e}")
+        return
+
+    if result is None:
+        return
+
+    result_df, truncated = result
+    if truncated:
+        st.info(f"Показано перші {MAX_ROWS} рядків.")
+    st.dataframe(result_df, use_container_width=True)
+    st.download_button(
+        "Завантажити результат (CSV)",
+        data=result_df.to_csv(index=False).encode("utf-8"),
+        file_name=f"{key}_query.csv",
+        mime="text/csv",
+        key=f"{key}_download"
+    )
@@ -0,0 +1,84 @@
+"""Прогрів кешів: завантаження і обробка таблиць усіх міст до приходу користувачів.
+
+Викликається один раз на процес - з monitoring.serve під час старту сервера
+або зі сторінок, якщо сервер запущено звичайним `streamlit run`.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from monitoring.cities import CITIES, KINDS
+
+logger = logging.getLogger(__name__)
+
+_started = threading.Event()
+_report = {"started": None, "seconds": None, "sheets": {}}
+
+
+def warm_sheet(city_id, kind):
+    """Проходить усі кешовані етапи, які не залежать від вибору користувача."""
+    from monitoring.pipeline import (
+        date_bounds,
+        forecast_table,
+        grid_options,
+        load_sheet,
+        period_table,
+        product_index,
+        recorded_ingest,
+        run_table,
+        wide_table,
+    )
+
+    url = CITIES[city_id][kind]
+    value_name, missing_as_zero = KINDS[kind]
+
+    data, version = load_sheet(url)
+    grid_options(version, data)
+    block, report = wide_table(version, data, value_name, missing_as_zero)
+    product_column = report["product_column"]
+    date_bounds(version, value_name, block)
+    product_index(version, product_column, data)
+    recorded_ingest(url, version, value_name, product_column, block)
+    forecast_table(version, value_name, product_column, "auto", block)
+    run_table(version, value_name, product_column, block)
+    period_table(version, value_name, product_column, block)
+
+
+def _timed(city_id, kind):
+    started = time.perf_counter()
+    try:
+        warm_sheet(city_id, kind)
+    except Exception as e:
+        logger.warning("Прогрів %s/%s не вдався: %s", city_id, kind, e)
+        return f"помилка: {e}"
+    return round(time.perf_counter() - started, 2)
+
+
+def warmup(max_workers=4):
+    """Прогріває всі таблиці всіх міст паралельно. Повертає звіт з часом."""
+    started = time.perf_counter()
+    _report["started"] = time.time()
+    sheets = [(city_id, kind) for city_id in CITIES for kind in KINDS]
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="warmup") as pool:
+        results = pool.map(lambda sheet: _timed(*sheet), sheets)
+        for (city_id, kind), result in zip(sheets, results):
+            _report["sheets"][f"{city_id}/{kind}"] = result
+
+    _report["seconds"] = round(time.perf_counter() - started, 2)
+    logger.info("Прогрів кешів завершено за %.2f с: %s", _report["seconds"], _report["sheets"])
+    return report()
+
+
+def start_warmup():
+    """Запускає прогрів у фоновому потоці, не більше одного разу на процес."""
+    if _started.is_set():
+        return
+    _started.set()
+    threading.Thread(target=warmup, name="warmup", daemon=True).start()
+
+
+def report():
+    """Звіт останнього прогріву: час старту, загальна тривалість, час по таблицях."""
+    return {"started": _report["started"], "seconds": _report["seconds"], "sheets": dict(_report["sheets"])}
@@ -0,0 +1,131 @@
+"""Широкий блок товар × дата для графіків і таблиць змін.
+
+Таблиці вже мають вигляд товар × дата, тому для взаємодії зі сторінкою дані
+тримаються як один масив NumPy з розібраним заголовком дат. Зріз за товарами і
+датами - це вибір рядків і відрізок стовпців блоку, без фільтрації довгої
+таблиці і повторного pivot при кожній зміні віджета.
+
+Блок будується один раз на версію даних прямо з перевіреної широкої таблиці
+(monitoring.ingest.clean_sheet), без перетворення в довгий формат. Довга
+таблиця (рядок на товар і дату) формується з блоку лише там, де вона потрібна:
+експорт, ряди в API, журнал змін. Блок для минулого стану таблиці будується з
+довгої таблиці журналу (from_long).
+"""
+import numpy as np
+import pandas as pd
+
+
+class WideBlock:
+    """Значення товарів (рядки) за датами (стовпці, відсортовані за зростанням).
+
+    attributes - ідентифікаційні стовпці таблиці (товар, категорія тощо) по
+    одному рядку на товар у порядку products.
+    """
+
+    def __init__(self, products, dates, values, product_column="Товар", value_name="Значення", attributes=None):
+        self.products = products
+        self.dates = dates
+        self.values = values
+        self.product_column = product_column
+        self.value_name = value_name
+        if attributes is None:
+            attributes = pd.DataFrame({product_column: products})
+        self.attributes = attributes.reset_index(drop=True)
+        self._positions = {product: position for position, product in enumerate(products)}
+
+    @classmethod
+    def from_long(cls, long_df, value_name, product_column="Товар"):
+        """Блок з довгої таблиці без дублікатів (один запис на товар і дату)."""
+        product_codes, products = pd.factorize(long_df[product_column], sort=True)
+        date_codes, dates = pd.factorize(long_df["Дата"], sort=True)
+        values = np.full((len(products), len(dates)), np.nan)
+        values[product_codes, date_codes] = long_df[value_name].to_numpy(dtype=float)
+
+        id_columns = [column for column in long_df.columns if column not in ("Дата", value_name)]
+        attributes = long_df[id_columns].drop_duplicates(subset=[product_column], keep="last")
+        attributes = attributes.set_index(product_column, drop=False).loc[products]
+        return cls(np.asarray(products, dtype=object), pd.DatetimeIndex(dates, name="Дата"), values,
+                   product_column, value_name, attributes)
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + int(self.attributes.memory_usage(index=True, deep=True).sum())
+
+    @property
+    def cells(self):
+        """Кількість клітинок зі значенням (рядків довгої таблиці)."""
+        return int(np.count_nonzero(~np.isnan(self.values)))
+
+    def rows(self, products):
+        """Позиції товарів у блоці (товари без даних пропускаються)."""
+        return np.array([self._positions[product] for product in products if product in self._positions],
+                        dtype=np.int64)
+
+    def columns(self, start_date, end_date):
+        """Відрізок стовпців для дат start_date..end_date включно (None - без обмеження)."""
+        return slice(
+            None if start_date is None else self.dates.searchsorted(pd.to_datetime(start_date), side="left"),
+            None if end_date is None else self.dates.searchsorted(pd.to_datetime(end_date), side="right"),
+        )
+
+    def frame(self, products, start_date, end_date):
+        """Таблиця дата × товар для графіка і розрахунку змін.
+
+        Як pivot відфільтрованої довгої таблиці: лише дати і товари, для яких є
+        хоча б одне значення у зрізі.
+        """
+        rows = self.rows(products)
+        block = self.values[rows, self.columns(start_date, end_date)]
+        dates = self.dates[self.columns(start_date, end_date)]
+
+        known = ~np.isnan(block)
+        has_product = known.any(axis=1)
+        has_date = known.any(axis=0)
+        if not has_product.all() or not has_date.all():
+            block = block[has_product][:, has_date]
+            rows, dates = rows[has_product], dates[has_date]
+
+        return pd.DataFrame(
+            block.T,
+            index=dates,
+            columns=pd.Index(self.products[rows], name=self.product_column),
+        )
+
+    def daily(self):
+        """Суцільна денна матриця дата × товар усіх товарів (пропуски - NaN)."""
+        frame = pd.DataFrame(
+            self.values.T,
+            index=self.dates,
+            columns=pd.Index(self.products, name=self.product_column),
+        )
+        if frame.empty:
+            return frame
+        return frame.reindex(pd.date_range(self.dates[0], self.dates[-1], freq="D", name="Дата"))
+
+    def _long(self, rows, columns):
+        block = self.values[rows, columns]
+        # Позиції ненульових клітинок ідуть за товаром, потім за датою
+        product_positions, date_positions = np.nonzero(~np.isnan(block))
+        long_df = self.attributes.iloc[rows[product_positions]].reset_index(drop=True)
+        long_df["Дата"] = self.dates[columns][date_positions]
+        long_df[self.value_name] = block[product_positions, date_positions]
+        return long_df
+
+    def iter_long(self, products=None, start_date=None, end_date=None, chunk_rows=100_000):
+        """Довга таблиця зрізу частинами приблизно по chunk_rows рядків.
+
+        Стовпці - ідентифікаційні стовпці таблиці, Дата і значення; рядки
+        відсортовані за товаром і датою, клітинки без значення пропускаються.
+        Частина завжди містить усі дати товару, тому хоча б одна частина є
+        навіть для порожнього зрізу.
+        """
+        rows = np.arange(len(self.products)) if products is None else self.rows(products)
+        columns = self.columns(start_date, end_date)
+        per_chunk = max(chunk_rows // max(len(self.dates[columns]), 1), 1)
+        for offset in range(0, max(len(rows), 1), per_chunk):
+            yield self._long(rows[offset:offset + per_chunk], columns)
+
+    def to_long(self, products=None, start_date=None, end_date=None):
+        """Довга таблиця зрізу одним DataFrame (див. iter_long)."""
+        rows = np.arange(len(self.products)) if products is None else self.rows(products)
+        return self._long(rows, self.columns(start_date, end_date))
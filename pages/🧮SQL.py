@@ -0,0 +1,7 @@
+from monitoring.views import render_sql
+from monitoring.warmup import start_warmup
+
+# Прогрів кешів усіх міст, якщо сервер запущено без monitoring.serve
+start_warmup()
+
+render_sql("SQL-запити", key="sql")
@@ -0,0 +1,40 @@
+"""Індекс кошика (monitoring.basket) проти прикладу, порахованого вручну."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from monitoring.basket import aligned_matrices, basket_index
+
+DAYS = pd.date_range("2024-01-01", periods=3, freq="D", name="Дата")
+
+
+@pytest.fixture
+def matrices():
+    # Товар "б" з'являється на другий день: ні ціни, ні кількості в перший день
+    prices = pd.DataFrame({"а": [10.0, 11.0, 12.0], "б": [np.nan, 20.0, 22.0], "в": [5.0, 5.0, 6.0]}, index=DAYS)
+    quantities = pd.DataFrame({"а": [5.0, 5.0, 4.0], "б": [np.nan, 3.0, 3.0], "в": [2.0, 4.0, 4.0]}, index=DAYS)
+    return aligned_matrices(prices, quantities)
+
+
+def test_index_from_first_day(matrices):
+    index = basket_index(*matrices)
+
+    # Кошик базового дня: "а" і "в"; "б" не порівнянний, бо не має ціни в базовий день
+    # Ласпейрес (q0 = 5, 2): (11*5 + 5*2) / (10*5 + 5*2), (12*5 + 6*2) / 60
+    np.testing.assert_allclose(index["Ласпейрес"], [100.0, 65 / 60 * 100, 72 / 60 * 100])
+    # Пааше: (11*5 + 5*4) / (10*5 + 5*4), (12*4 + 6*4) / (10*4 + 5*4)
+    np.testing.assert_allclose(index["Пааше"], [100.0, 75 / 70 * 100, 72 / 60 * 100])
+    # Ланцюговий: друга ланка вже з "б" і вагами другого дня (5, 3, 4)
+    np.testing.assert_allclose(index["Ланцюговий"], [100.0, 65 / 60 * 100, 65 / 60 * 150 / 135 * 100])
+    assert index["Товарів у кошику"].tolist() == [2, 2, 2]
+
+
+def test_product_introduced_before_base_day_is_in_basket(matrices):
+    prices, quantities = matrices
+    index = basket_index(prices.loc[DAYS[1]:], quantities.loc[DAYS[1]:])
+
+    # Ласпейрес (q0 = 5, 3, 4): (12*5 + 22*3 + 6*4) / (11*5 + 20*3 + 5*4)
+    np.testing.assert_allclose(index["Ласпейрес"], [100.0, 150 / 135 * 100])
+    # Пааше (q = 4, 3, 4): (12*4 + 22*3 + 6*4) / (11*4 + 20*3 + 5*4)
+    np.testing.assert_allclose(index["Пааше"], [100.0, 138 / 124 * 100])
+    assert index["Товарів у кошику"].tolist() == [3, 3]
@@ -0,0 +1,70 @@
+"""Журнал змін (monitoring.history): відновлення кожного минулого стану таблиці."""
+import pandas as pd
+import pytest
+
+from monitoring import history
+
+DAYS = pd.to_datetime(["2024-01-01", "2024-01-02", "2024-01-03"])
+
+
+def _long_table(rows, id_columns):
+    long_df = pd.DataFrame(rows, columns=[*id_columns, "Дата", "Ціна"])
+    long_df["Дата"] = pd.to_datetime(long_df["Дата"])
+    return long_df.sort_values(by=["Товар", "Дата"], kind="stable").reset_index(drop=True)
+
+
+@pytest.fixture
+def history_dir(tmp_path, monkeypatch):
+    # Те саме, що PRICE_MONITORING_DATA=<tmp_path> до імпорту модуля
+    monkeypatch.setattr(history, "HISTORY_DIR", str(tmp_path / "history"))
+    return tmp_path
+
+
+def test_as_of_restores_every_ingest(history_dir):
+    first = _long_table([
+        ("молоко", "молочні", DAYS[0], 30.0),
+        ("молоко", "молочні", DAYS[1], 31.0),
+        ("хліб", "випічка", DAYS[0], 20.0),
+        ("хліб", "випічка", DAYS[1], 20.0),
+    ], ["Товар", "Категорія"])
+    # Змінено ціну, додано день і товар, змінено категорію, зник товар "хліб"
+    second = _long_table([
+        ("молоко", "молочні продукти", DAYS[0], 30.0),
+        ("молоко", "молочні продукти", DAYS[1], 32.5),
+        ("молоко", "молочні продукти", DAYS[2], 33.0),
+        ("сир", "молочні продукти", DAYS[2], 120.0),
+    ], ["Товар", "Категорія"])
+    # Новий ідентифікаційний стовпець перед товаром, "хліб" повернувся
+    third = _long_table([
+        ("Київ", "молоко", "молочні продукти", DAYS[2], 33.0),
+        ("Київ", "сир", "молочні продукти", DAYS[2], 118.0),
+        ("Київ", "хліб", "випічка", DAYS[1], 21.0),
+    ], ["Ринок", "Товар", "Категорія"])
+    tables = [first, second, third]
+
+    for number, long_df in enumerate(tables, start=1):
+        ingest = history.record_ingest("sheet", f"v{number}", long_df, "Ціна")
+        assert ingest["id"] == number
+    # Повторне завантаження тієї самої версії не створює нового запису
+    assert history.record_ingest("sheet", "v3", third, "Ціна")["id"] == 3
+    assert [ingest["version"] for ingest in history.list_ingests("sheet")] == ["v1", "v2", "v3"]
+
+    for number, long_df in enumerate(tables, start=1):
+        restored = history.as_of("sheet", number, "Ціна")
+        pd.testing.assert_frame_equal(restored, long_df, check_dtype=False)
+
+
+def test_diff_lists_changed_cells_only(history_dir):
+    first = _long_table([("молоко", DAYS[0], 30.0), ("хліб", DAYS[0], 20.0)], ["Товар"])
+    second = _long_table([("молоко", DAYS[0], 31.0), ("хліб", DAYS[0], 20.0)], ["Товар"])
+    history.record_ingest("sheet", "v1", first, "Ціна")
+    history.record_ingest("sheet", "v2", second, "Ціна")
+
+    diff = history.read_diff("sheet", 2)
+
+    assert diff[["Товар", "Було", "Стало"]].values.tolist() == [["молоко", 30.0, 31.0]]
+
+
+def test_unknown_ingest(history_dir):
+    with pytest.raises(KeyError):
+        history.as_of("sheet", 1)
@@ -0,0 +1,60 @@
+"""Перевірка схеми і очищення таблиці (monitoring.ingest) на невеликому аркуші з помилками."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from monitoring.ingest import SchemaError, clean_sheet, split_columns
+
+COLUMNS = ["Товар", "Категорія", "01.01.2024", "02.01.2024", "31.02.2024", "01.01.2024.1", "1/3/24"]
+
+
+@pytest.fixture
+def sheet():
+    return pd.DataFrame([
+        ["a", "x", "10,5", "11 грн", "9", "12", "abc"],
+        ["b", "y", None, "20", "", None, "21"],
+        [None, "z", "1", "1", "1", "1", "1"],
+    ], columns=COLUMNS)
+
+
+def test_split_columns():
+    dates, recovered, malformed, repeated, id_columns = split_columns(COLUMNS)
+
+    assert dates == {
+        "01.01.2024": pd.Timestamp("2024-01-01"),
+        "02.01.2024": pd.Timestamp("2024-01-02"),
+        "01.01.2024.1": pd.Timestamp("2024-01-01"),
+        "1/3/24": pd.Timestamp("2024-03-01"),
+    }
+    assert recovered == ["1/3/24"]
+    assert malformed == ["31.02.2024"]
+    assert repeated == ["01.01.2024.1"]
+    assert id_columns == ["Товар", "Категорія"]
+
+
+def test_clean_sheet(sheet):
+    block, report = clean_sheet(sheet, "Ціна")
+
+    assert block.products.tolist() == ["a", "b"]
+    assert block.dates.tolist() == pd.to_datetime(["2024-01-01", "2024-01-02", "2024-03-01"]).tolist()
+    # Повтор 01.01.2024 - перемагає останній стовпець; "abc" не розпізнано
+    np.testing.assert_array_equal(block.values, [[12.0, 11.0, np.nan], [np.nan, 20.0, 21.0]])
+    assert block.attributes["Категорія"].tolist() == ["x", "y"]
+    assert report["product_column"] == "Товар"
+    assert report["date_columns"] == 4
+    assert report["rows"] == 4
+    assert report["missing_products"] == 1
+    assert report["invalid_cells"] == 1
+    assert report["invalid_samples"] == [("a", "01.03.2024", "abc")]
+    assert report["duplicates"] == 1
+
+
+def test_clean_sheet_missing_as_zero(sheet):
+    block, _ = clean_sheet(sheet, "Кількість", missing_as_zero=True)
+
+    np.testing.assert_array_equal(block.values, [[12.0, 11.0, 0.0], [0.0, 20.0, 21.0]])
+
+
+def test_sheet_without_dates():
+    with pytest.raises(SchemaError):
+        clean_sheet(pd.DataFrame({"Товар": ["a"], "Примітка": ["b"]}), "Ціна")
@@ -0,0 +1,122 @@
+"""Стиснені ряди (monitoring.runs) проти денного ряду, заповненого останнім відомим значенням."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from monitoring.fill import daily_frame, fill_gaps
+from monitoring.runs import encode_block, encode_runs
+from monitoring.stats import FILLED_COLUMN, price_changes, quantity_changes, run_changes
+from monitoring.wide import WideBlock
+
+FIRST_DAY = pd.Timestamp("2024-01-01")
+WINDOWS = [
+    ("2024-01-01", "2024-03-31"),
+    ("2024-01-10", "2024-01-20"),
+    ("2024-02-03", "2024-02-03"),
+    ("2024-03-01", "2024-06-30"),
+    ("2023-12-01", "2024-01-05"),
+    ("2024-08-01", "2024-08-31"),
+]
+
+
+def _long_table(seed, products=12, days=90):
+    """Довга таблиця з пропусками, товарами, що з'являються пізніше і зникають раніше."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for number in range(products):
+        first, last = sorted(rng.integers(0, days, size=2))
+        levels = rng.choice([10.0, 12.5, 15.0, 20.0], size=days)
+        # Ціна тримається кілька днів поспіль, частина днів без спостережень
+        values = np.repeat(levels, 5)[:days]
+        for day in range(first, last + 1):
+            if rng.random() < 0.7:
+                rows.append((f"товар {number:02d}", FIRST_DAY + pd.Timedelta(days=int(day)), values[day]))
+    long_df = pd.DataFrame(rows, columns=["Товар", "Дата", "Ціна"])
+    return long_df.sort_values(["Товар", "Дата"], kind="stable").reset_index(drop=True)
+
+
+def _daily_locf(long_df, start_date, end_date):
+    """Денний ряд усієї історії після ffill (fill_gaps "locf") і маска спостережених днів у діапазоні."""
+    pivot = long_df.pivot(index="Дата", columns="Товар", values="Ціна")
+    products = pivot.columns.tolist()
+    history_start = min(pivot.index.min(), pd.Timestamp(start_date))
+    wide, truncated = daily_frame(pivot, history_start, end_date, columns=products)
+    assert not truncated
+    filled, _ = fill_gaps(wide, "locf")
+    window = slice(pd.Timestamp(start_date), pd.Timestamp(end_date))
+    return filled.loc[window], wide.notna().loc[window]
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize("start_date, end_date", WINDOWS)
+def test_range_stats_match_daily_locf(seed, start_date, end_date):
+    long_df = _long_table(seed)
+    filled, observed = _daily_locf(long_df, start_date, end_date)
+    stats = encode_runs(long_df, "Ціна").range_stats(start_date, end_date).reindex(filled.columns)
+
+    np.testing.assert_allclose(stats["Початкове"], filled.iloc[0])
+    np.testing.assert_allclose(stats["Кінцеве"], filled.iloc[-1])
+    np.testing.assert_allclose(stats["Середнє"], filled.mean())
+    np.testing.assert_allclose(stats["Макс."], filled.max())
+    has_value = filled.notna().any()
+    expected_dates = filled.loc[:, has_value].idxmax()
+    pd.testing.assert_series_equal(
+        stats.loc[has_value, "Дата макс."], expected_dates, check_names=False, check_index=False
+    )
+    expected_filled = (filled.notna() & ~observed).sum()
+    np.testing.assert_array_equal(stats["Заповнено днів"], expected_filled)
+
+
+def test_last_value_carried_to_end_date():
+    long_df = pd.DataFrame({
+        "Товар": ["a"] * 3,
+        "Дата": pd.to_datetime(["2024-01-01", "2024-01-02", "2024-01-03"]),
+        "Ціна": [5.0, 5.0, 8.0],
+    })
+    stats = encode_runs(long_df, "Ціна").range_stats("2024-01-01", "2024-01-05").loc["a"]
+
+    assert stats["Кінцеве"] == 8.0
+    assert stats["Середнє"] == pytest.approx((5 + 5 + 8 + 8 + 8) / 5)
+    assert stats["Заповнено днів"] == 2
+
+
+def test_gap_with_same_value_is_not_observed():
+    long_df = pd.DataFrame({
+        "Товар": ["a"] * 2,
+        "Дата": pd.to_datetime(["2024-01-01", "2024-01-05"]),
+        "Ціна": [5.0, 5.0],
+    })
+    runs = encode_runs(long_df, "Ціна")
+    stats = runs.range_stats("2024-01-01", "2024-01-05").loc["a"]
+
+    assert len(runs) == 1
+    assert stats["Заповнено днів"] == 3
+
+
+def test_block_encoding_matches_long_table():
+    long_df = _long_table(4)
+    products = ["товар 03", "товар 07", "немає"]
+    from_long = encode_runs(long_df, "Ціна")
+    from_block = encode_block(WideBlock.from_long(long_df, "Ціна"))
+
+    assert len(from_block) == len(from_long)
+    for start_date, end_date in WINDOWS:
+        pd.testing.assert_frame_equal(from_block.range_stats(start_date, end_date, products),
+                                      from_long.range_stats(start_date, end_date, products))
+    assert from_block.range_stats("2024-01-01", "2024-01-31", []).empty
+
+
+@pytest.mark.parametrize("value_name, changes", [("Ціна", price_changes), ("Кількість", quantity_changes)])
+def test_run_changes_match_fill_engine(value_name, changes):
+    long_df = _long_table(3).rename(columns={"Ціна": value_name})
+    start_date, end_date = "2024-01-15", "2024-03-10"
+    filled, observed = _daily_locf(long_df.rename(columns={value_name: "Ціна"}), start_date, end_date)
+    products = filled.columns.tolist()
+
+    stats = encode_runs(long_df, value_name).range_stats(start_date, end_date, products)
+    result = run_changes(stats, value_name, products, start_date, end_date)
+    expected = changes(filled, (filled.notna() & ~observed).sum() / len(filled.index))
+
+    pd.testing.assert_frame_equal(result.drop(columns=FILLED_COLUMN), expected.drop(columns=FILLED_COLUMN),
+                                  check_dtype=False)
+    np.testing.assert_allclose(result[FILLED_COLUMN], expected[FILLED_COLUMN])